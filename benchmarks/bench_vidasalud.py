@@ -0,0 +1,200 @@
+"""Benchmarks del filtrador Vidasalud sin interfaz gráfica.
+
+Genera un libro sintético con el layout real (fila de título, encabezados en la
+fila 2 -> header=1, columna "Prestación") y mide las rutas de la aplicación:
+lectura (cargar_archivo), recarga desde caché, índice de prestaciones, filtro,
+render de la grilla (mostrar_resultados) y exportación (guardar_df).
+
+Uso:
+    python benchmarks/bench_vidasalud.py --filas 100000 --salida bench.json
+    python benchmarks/bench_vidasalud.py --filas 100000 --comparar bench.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sistema_vidasalud sin error.py")
+
+# Filas que muestra la grilla virtual en una ventana típica
+FILAS_VISIBLES = 25
+
+
+def cargar_app():
+    """Importa el script de la aplicación (su nombre tiene espacios)"""
+    spec = importlib.util.spec_from_file_location("vidasalud_app", APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    sys.modules["vidasalud_app"] = app  # Necesario para el pool de procesos
+    spec.loader.exec_module(app)
+    return app
+
+
+def generar_libro(path, filas, columnas=12, cardinalidad=300, seed=0):
+    """Escribe un xlsx sintético con filas x columnas y `cardinalidad` prestaciones distintas"""
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    prestaciones = [f"PRESTACIÓN {i:04d} - {rnd.choice(['Limpieza', 'Extracción', 'Corona', 'Endodoncia', 'Resina'])}"
+                    for i in range(cardinalidad)]
+    # Distribución sesgada, como en los datos reales: pocas prestaciones concentran la mayoría
+    pesos = [1.0 / (i + 1) for i in range(cardinalidad)]
+    profesionales = [f"Dr(a). Profesional {i:03d}" for i in range(max(1, cardinalidad // 10))]
+    inicio = date(2024, 1, 1)
+
+    base = ["Prestación", "Fecha Atención", "Profesional", "Paciente", "RUT", "Monto"]
+    extras = [f"Campo {i}" for i in range(max(0, columnas - len(base)))]
+    encabezados = (base + extras)[:max(1, columnas)]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Prestaciones")
+    ws.append(["Reporte de prestaciones Vidasalud Dental (sintético)"])
+    ws.append(encabezados)
+    for n, prestacion in enumerate(rnd.choices(prestaciones, weights=pesos, k=filas)):
+        fila = [
+            prestacion,
+            inicio + timedelta(days=rnd.randrange(365)),
+            rnd.choice(profesionales),
+            f"Paciente {rnd.randrange(filas // 3 + 1):06d}",
+            f"{rnd.randrange(5_000_000, 25_000_000)}-{rnd.randrange(10)}",
+            rnd.randrange(5, 400) * 1000,
+        ]
+        fila += [f"valor {n % 97}" for _ in extras]
+        ws.append(fila[:len(encabezados)])
+    wb.save(path)
+    return path
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta funcion() `repeticiones` veces; devuelve (último resultado, tiempos en segundos)"""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, tiempos
+
+
+def resumen(tiempos, filas=None):
+    datos = {"min_s": min(tiempos), "mediana_s": statistics.median(tiempos), "repeticiones": len(tiempos)}
+    if filas is not None:
+        datos["filas"] = filas
+        datos["filas_por_s"] = filas / max(min(tiempos), 1e-9)
+    return datos
+
+
+def ejecutar(args):
+    app = cargar_app()
+    import openpyxl
+    import pandas as pd
+
+    tmp = tempfile.mkdtemp(prefix="vidasalud_bench_")
+    try:
+        libro = os.path.join(tmp, "bench.xlsx")
+        print(f"Generando {args.filas:,} filas x {args.columnas} columnas...", file=sys.stderr)
+        _, t_gen = medir(lambda: generar_libro(libro, args.filas, args.columnas, args.cardinalidad, args.seed), 1)
+
+        r = args.repeticiones
+        res = {}
+
+        print("Lectura...", file=sys.stderr)
+        df, t = medir(lambda: app.leer_excel(libro), r)
+        res["lectura"] = resumen(t, len(df))
+
+        cache_dir = os.path.join(tmp, "cache")
+        _, t = medir(lambda: app.leer_excel(libro, cache_dir), 1)  # Escribe la caché
+        res["lectura_con_escritura_cache"] = resumen(t, len(df))
+        _, t = medir(lambda: app.leer_excel(libro, cache_dir), r)
+        res["recarga_desde_cache"] = resumen(t, len(df))
+
+        (prestaciones, indice), t = medir(lambda: app.indexar_prestaciones(df), r)
+        res["indice_prestaciones"] = resumen(t, len(df))
+
+        mayor = max(indice, key=lambda p: len(indice[p]))
+        motor = app.MotorFiltros(df, indice, max_cache=0)  # Sin LRU: mide la toma por índice
+        resultado, t = medir(lambda: motor.resultado([("Prestación", "=", mayor)]), r)
+        res["filtro_prestacion"] = resumen(t, len(resultado))
+
+        # Lo que hace mostrar_resultados al pintar/scrollear: formatear una ventana visible
+        offsets = [0, len(resultado) // 2, max(0, len(resultado) - FILAS_VISIBLES)]
+        _, t = medir(lambda: [app.formatear_filas(resultado, slice(o, o + FILAS_VISIBLES)) for o in offsets], r)
+        res["render_ventana"] = resumen([x / len(offsets) for x in t], FILAS_VISIBLES)
+
+        for formato in args.formatos:
+            destino = os.path.join(tmp, f"export.{formato}")
+            try:
+                _, t = medir(lambda: app.exportar_dataframe(resultado, destino, formato), r)
+                res[f"exportacion_{formato}"] = resumen(t, len(resultado))
+            except Exception as e:
+                res[f"exportacion_{formato}"] = {"error": str(e)}
+
+        return {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "entorno": {
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "cpus": os.cpu_count(),
+                "pandas": pd.__version__,
+                "openpyxl": openpyxl.__version__,
+            },
+            "parametros": {
+                "filas": args.filas,
+                "columnas": args.columnas,
+                "cardinalidad": args.cardinalidad,
+                "seed": args.seed,
+                "tamano_xlsx_bytes": os.path.getsize(libro),
+                "generacion_s": t_gen[0],
+                "prestaciones_distintas": len(prestaciones),
+            },
+            "resultados": res,
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def comparar(actual, anterior_path):
+    """Imprime la razón actual/anterior de los tiempos mínimos (>1 = más lento)"""
+    with open(anterior_path, encoding="utf-8") as f:
+        anterior = json.load(f)
+    print(f"{'operación':32} {'anterior':>10} {'actual':>10} {'razón':>7}")
+    for nombre, datos in actual["resultados"].items():
+        previo = anterior.get("resultados", {}).get(nombre, {})
+        if "min_s" not in datos or "min_s" not in previo:
+            continue
+        razon = datos["min_s"] / max(previo["min_s"], 1e-9)
+        print(f"{nombre:32} {previo['min_s']:10.4f} {datos['min_s']:10.4f} {razon:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--columnas", type=int, default=12)
+    parser.add_argument("--cardinalidad", type=int, default=300, help="prestaciones distintas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--formatos", nargs="+", default=["xlsx", "csv"])
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument("--comparar", metavar="JSON", help="resultados anteriores para comparar")
+    args = parser.parse_args(argv)
+
+    datos = ejecutar(args)
+    texto = json.dumps(datos, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    if args.comparar:
+        comparar(datos, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
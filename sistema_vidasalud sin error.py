@@ -1,12 +1,35 @@
-import pandas as pd
+import time
+_T_INICIO = time.perf_counter()  # Referencia del informe de arranque
+
+import argparse
+import cProfile
+import importlib
+import importlib.util
+import logging
+import logging.handlers
 import tkinter as tk  # Keep for file dialogs and some constants if needed
 from tkinter import ttk, messagebox, filedialog
-import customtkinter as ctk  # NEW: Modern UI library
 import os
 from datetime import datetime
 import glob
+import hashlib
+import hmac
+import json
+import multiprocessing
 import sys
-import threading  # For non-blocking operations if needed
+import tempfile
+import queue
+import re
+import secrets
+import ssl
+import threading  # Background load / filter / export
+import typing
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Configuration for High DPI (Windows) - Optional but good practice
 try:
@@ -15,11 +38,1120 @@ try:
 except:
     pass
 
-# --- THEME CONFIGURATION ---
-# "System" uses the OS mode (Dark/Light)
-# "DarkBlue", "Blue", "Green" are built-in themes. We can use a custom color if needed for "Million Dollar" look.
-ctk.set_appearance_mode("System")  
-ctk.set_default_color_theme("blue")  # We will override specific colors for a premium look
+# --- IMPORTACIONES DIFERIDAS ---
+# pandas/numpy (y openpyxl a través de pandas) y customtkinter son lo más lento del
+# arranque, sobre todo en el ejecutable. Se importan en el primer uso: la ventana se
+# pinta antes, y --batch/--servidor y los procesos hijos nunca cargan la interfaz.
+TIEMPOS_IMPORTACION = {}  # módulo -> segundos, para el informe de arranque
+
+
+def _importar_medido(nombre):
+    if nombre not in sys.modules:
+        inicio = time.perf_counter()
+        modulo = importlib.import_module(nombre)
+        TIEMPOS_IMPORTACION.setdefault(nombre, round(time.perf_counter() - inicio, 4))
+        return modulo
+    return importlib.import_module(nombre)
+
+
+class _ModuloDiferido:
+    """Se comporta como el módulo, pero lo importa recién al acceder a un atributo"""
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def _cargar(self):
+        if self._modulo is None:
+            self._modulo = _importar_medido(self._nombre)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._cargar(), atributo)
+
+
+np = _ModuloDiferido("numpy")
+pd = _ModuloDiferido("pandas")
+ctk = _ModuloDiferido("customtkinter")  # NEW: Modern UI library
+
+if typing.TYPE_CHECKING:
+    # Nunca se ejecuta, pero deja las importaciones a la vista de PyInstaller (y de
+    # los editores): import_module(nombre) con una variable no se puede seguir
+    import customtkinter  # noqa: F401
+    import numpy  # noqa: F401
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+
+# Inicio diferido: lo que no hace falta para la primera pintura se hace después
+INICIO_DIFERIDO_MS = 50
+MODULOS_PRECARGA = ("numpy", "pandas", "openpyxl")
+
+# --- GRILLA VIRTUAL ---
+# Solo las filas visibles (más un pequeño margen) existen como items del Treeview;
+# el contenido se rellena desde el DataFrame a medida que el usuario hace scroll.
+TREE_ROW_HEIGHT = 35
+TREE_HEADING_HEIGHT = 30
+VIRTUAL_BUFFER_ROWS = 2
+
+# Búsqueda de prestaciones: espera tras la última tecla y máximo de opciones en el combo
+DEBOUNCE_MS = 150
+MAX_SUGERENCIAS = 200
+
+# Intervalo (ms) con que el hilo de Tk revisa el avance de las tareas en segundo plano
+POLL_MS = 100
+
+
+def formatear_filas(df, posiciones, columnas=None):
+    """Convierte las filas indicadas (posiciones iloc) en listas de texto para el Treeview"""
+    if columnas is None:
+        bloque = df.iloc[posiciones]
+    else:
+        bloque = df.iloc[posiciones, columnas]
+    return [[str(val) for val in fila] for fila in bloque.itertuples(index=False, name=None)]
+
+
+def indexar_prestaciones(df):
+    """Construye (prestaciones ordenadas, {prestación: posiciones de fila}) en una sola pasada"""
+    claves = pd.Categorical(df["Prestación"].astype(str))
+    prestaciones = [str(c) for c in claves.categories]  # Ya vienen ordenadas
+    grupos = pd.Series(claves.codes).groupby(claves.codes).indices
+    indice = {prestaciones[codigo]: posiciones for codigo, posiciones in grupos.items() if codigo >= 0}
+    return prestaciones, indice
+
+
+# --- FILTROS MULTICRITERIO ---
+# Cada criterio es (columna, operador, valor):
+#   "="         valor: texto
+#   "en lista"  valor: lista de textos
+#   "entre"     valor: (desde, hasta); cualquiera de los dos puede ir vacío
+#   "contiene"  valor: texto (sin distinguir mayúsculas)
+# Los valores llegan como texto y se convierten según el tipo de la columna.
+OPERADORES_FILTRO = ["=", "en lista", "entre", "contiene"]
+FILTRO_CACHE_MAX = 16
+
+
+def normalizar_criterios(criterios):
+    """Forma canónica (tupla ordenada y hashable) de los criterios, usada como clave de caché"""
+    normal = []
+    for col, op, valor in criterios:
+        if op not in OPERADORES_FILTRO:
+            raise ValueError(f"Operador de filtro desconocido: {op}")
+        # Sin strip: "Limpieza " es otro valor que "Limpieza" (el texto del usuario
+        # ya viene limpio desde parsear_valor_criterio)
+        if op == "en lista":
+            valor = tuple(sorted({str(v) for v in valor if str(v) != ""}))
+        elif op == "entre":
+            desde, hasta = valor
+            valor = (str(desde).strip(), str(hasta).strip())
+        else:
+            valor = str(valor)
+        normal.append((col, op, valor))
+    return tuple(sorted(normal, key=lambda c: (str(c[0]), c[1], repr(c[2]))))
+
+
+def parsear_valor_criterio(op, texto):
+    """Valor de un criterio a partir del texto que escribe el usuario (o de la URL)"""
+    if op == "en lista":
+        return [v.strip() for v in texto.split(",") if v.strip()]
+    if op == "entre":
+        desde, _, hasta = texto.partition(";")
+        return (desde.strip(), hasta.strip())
+    return texto.strip()
+
+
+def _convertir_valor(serie, texto):
+    """Convierte el texto del criterio al tipo de la columna (número, fecha o texto)"""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return pd.to_numeric(texto)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return pd.to_datetime(texto, dayfirst=True)
+    return texto
+
+
+def mascara_criterio(df, col, op, valor):
+    """Máscara booleana vectorizada (numpy) de un criterio"""
+    serie = df[col]
+    tipada = (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie)) \
+        and not isinstance(serie.dtype, pd.CategoricalDtype)
+
+    if op == "contiene":
+        mascara = serie.astype(str).str.contains(valor, case=False, regex=False, na=False)
+    elif op == "=":
+        mascara = (serie == _convertir_valor(serie, valor)) if tipada else (serie.astype(str) == valor)
+    elif op == "en lista":
+        if tipada:
+            mascara = serie.isin([_convertir_valor(serie, v) for v in valor])
+        else:
+            mascara = serie.astype(str).isin(valor)
+    else:  # "entre"
+        desde, hasta = valor
+        comparable = serie if tipada else serie.astype(str)
+        mascara = pd.Series(True, index=serie.index)
+        if desde:
+            mascara &= comparable >= (_convertir_valor(serie, desde) if tipada else desde)
+        if hasta:
+            mascara &= comparable <= (_convertir_valor(serie, hasta) if tipada else hasta)
+    return np.asarray(mascara.fillna(False), dtype=bool)
+
+
+class MotorFiltros:
+    """Combina criterios en una sola máscara y recuerda los últimos resultados (LRU)"""
+
+    def __init__(self, df, indice_prestaciones=None, max_cache=FILTRO_CACHE_MAX):
+        self.df = df
+        self.indice = indice_prestaciones
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()  # Solo protege el diccionario, no el cálculo
+
+    def posiciones(self, criterios):
+        """Posiciones (iloc, en orden) de las filas que cumplen todos los criterios"""
+        clave = normalizar_criterios(criterios)
+        with self._cache_lock:
+            if clave in self._cache:
+                self._cache.move_to_end(clave)
+                return self._cache[clave]
+
+        # Una igualdad sobre Prestación se resuelve con el índice: el resto de
+        # los criterios solo se evalúa sobre esas filas
+        base = None
+        resto = []
+        for col, op, valor in clave:
+            if base is None and col == "Prestación" and op == "=" and self.indice is not None:
+                base = self.indice.get(valor, np.array([], dtype=np.intp))
+            else:
+                resto.append((col, op, valor))
+
+        sub = self.df if base is None else self.df.take(base)
+        mascara = np.ones(len(sub), dtype=bool)
+        for col, op, valor in resto:
+            mascara &= mascara_criterio(sub, col, op, valor)
+        posiciones = np.flatnonzero(mascara) if base is None else base[mascara]
+
+        with self._cache_lock:
+            self._cache[clave] = posiciones
+            if len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        return posiciones
+
+    def resultado(self, criterios):
+        return self.df.take(self.posiciones(criterios))
+
+
+class IndiceBusqueda:
+    """Búsqueda por subcadena sobre los nombres de prestación (índice de trigramas)"""
+
+    def __init__(self, nombres):
+        self.minusculas = [n.lower() for n in nombres]
+        self.trigramas = {}
+        for i, nombre in enumerate(self.minusculas):
+            for k in range(len(nombre) - 2):
+                self.trigramas.setdefault(nombre[k:k + 3], set()).add(i)
+        self._ultima_consulta = ""
+        self._ultimo_resultado = list(range(len(nombres)))
+
+    def buscar(self, texto):
+        """Posiciones (en orden) de los nombres que contienen texto"""
+        texto = texto.lower()
+        if texto == self._ultima_consulta:
+            return self._ultimo_resultado
+
+        if self._ultima_consulta and self._ultima_consulta in texto:
+            # La consulta solo creció: basta con refinar el resultado anterior
+            candidatos = self._ultimo_resultado
+        elif len(texto) >= 3:
+            conjuntos = [self.trigramas.get(texto[k:k + 3], set()) for k in range(len(texto) - 2)]
+            conjuntos.sort(key=len)
+            candidatos = sorted(set.intersection(*conjuntos))
+        else:
+            candidatos = range(len(self.minusculas))
+
+        self._ultima_consulta = texto
+        self._ultimo_resultado = [i for i in candidatos if texto in self.minusculas[i]]
+        return self._ultimo_resultado
+
+
+# --- COMPACTACIÓN ---
+# Tras leer el Excel: texto repetitivo -> category, enteros al tipo más chico,
+# columnas "fecha" en texto -> datetime. Es idempotente (se aplica también tras concatenar).
+CATEGORIA_MAX_PROPORCION = 0.5
+
+
+def compactar_dataframe(df):
+    """Reduce la memoria del DataFrame modificando sus columnas in situ; lo devuelve"""
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(serie):
+            continue
+
+        if pd.api.types.is_integer_dtype(serie):
+            df[col] = pd.to_numeric(serie, downcast="integer")
+        elif pd.api.types.is_float_dtype(serie):
+            # Montos enteros sin vacíos (p. ej. pesos) se guardan como entero
+            if len(serie) and serie.notna().all() and (serie % 1 == 0).all():
+                df[col] = pd.to_numeric(serie.astype("int64"), downcast="integer")
+        elif pd.api.types.infer_dtype(serie, skipna=True) == "string":
+            if "fecha" in str(col).lower():
+                fechas = pd.to_datetime(serie, errors="coerce", dayfirst=True)
+                if fechas.notna().sum() == serie.notna().sum():
+                    df[col] = fechas
+                    continue
+            if serie.nunique(dropna=True) <= CATEGORIA_MAX_PROPORCION * len(serie):
+                df[col] = serie.astype("category")
+    return df
+
+
+def formatear_bytes(n):
+    return f"{n / (1024 * 1024):,.1f} MB"
+
+
+# --- MODO BIBLIOTECA ---
+# Todos los xlsx de archivos_excel en un solo DataFrame, con el archivo de origen por fila
+COLUMNA_ORIGEN = "Archivo Origen"
+
+
+def cargar_biblioteca(archivos, cache_dir=None, progreso=None, cancelado=None, columnas=None):
+    """Lee los archivos en paralelo (un proceso por núcleo) y los concatena con su origen
+
+    Los que están en caché se leen en este proceso: mandarlos a un worker costaría
+    deserializar allá y volver a serializar el DataFrame completo de vuelta.
+    """
+    frames = {}
+    n = 0
+    for path in archivos:
+        if cancelado is not None and cancelado.is_set():
+            return None
+        df = _leer_de_cache(path, cache_dir, columnas)
+        if df is not None:
+            frames[path] = df
+            n += 1
+            if progreso is not None:
+                progreso(n / len(archivos), f"{n}/{len(archivos)} archivos leídos")
+
+    pendientes = [path for path in archivos if path not in frames]
+    if pendientes:
+        max_workers = max(1, min(len(pendientes), os.cpu_count() or 1))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futuros = {pool.submit(leer_excel, path, cache_dir, columnas): path for path in pendientes}
+            for futuro in as_completed(futuros):
+                if cancelado is not None and cancelado.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return None
+
+                path = futuros[futuro]
+                try:
+                    frames[path] = futuro.result()
+                except Exception as e:
+                    raise Exception(f"{os.path.basename(path)}: {e}")
+                n += 1
+                if progreso is not None:
+                    progreso(n / len(archivos), f"{n}/{len(archivos)} archivos leídos")
+
+    # Orden estable (el de la lista), sin importar cuál proceso terminó primero
+    partes = [frames.pop(path) for path in archivos]
+    longitudes = [len(parte) for parte in partes]
+    df = pd.concat(partes, ignore_index=True, sort=False)
+    del partes
+    # El origen se agrega después de concatenar (sin copiar cada parte) y como category
+    df[COLUMNA_ORIGEN] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(archivos)), longitudes),
+        categories=[os.path.basename(path) for path in archivos],
+    )
+    return df
+
+
+# --- EXPORTACIÓN ---
+# xlsx y csv se escriben por bloques (memoria constante); parquet requiere pyarrow y
+# solo se ofrece si está instalado (find_spec no lo importa, así que no retrasa el arranque)
+FORMATOS_EXPORTACION = ["xlsx", "csv"] + (["parquet"] if importlib.util.find_spec("pyarrow") else [])
+EXPORT_CHUNK_ROWS = 5000
+# Límite de filas de una hoja de Excel (encabezado incluido); si no cabe, se reparte en varias hojas
+EXCEL_MAX_FILAS = 1048576
+
+
+class _ExportacionCancelada(Exception):
+    pass
+
+
+def exportar_dataframe(df, path, formato="xlsx", progreso=None, cancelado=None):
+    """Escribe df en path; devuelve filas por segundo, o None si se canceló"""
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+
+    inicio = time.perf_counter()
+    total = len(df)
+
+    def bloques():
+        for desde in range(0, total, EXPORT_CHUNK_ROWS):
+            if cancelado is not None and cancelado.is_set():
+                raise _ExportacionCancelada()
+            yield desde, df.iloc[desde:desde + EXPORT_CHUNK_ROWS]
+            if progreso is not None:
+                hechas = min(total, desde + EXPORT_CHUNK_ROWS)
+                velocidad = hechas / max(time.perf_counter() - inicio, 1e-9)
+                progreso(hechas / total, f"{hechas:,}/{total:,} filas ({velocidad:,.0f} filas/s)")
+
+    try:
+        if formato == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise Exception("Para exportar a Parquet instale pyarrow (pip install pyarrow).")
+            # Parquet exige un tipo por columna: las de texto con números sueltos (p. ej. un
+            # código de prestación 101 entre nombres) se escriben como texto
+            mixtas = [c for c in df.columns
+                      if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True).startswith("mixed")]
+            if mixtas:
+                df = df.copy()
+                for c in mixtas:
+                    df[c] = df[c].where(df[c].isna(), df[c].astype(str))
+            df.to_parquet(path, index=False)
+
+        elif formato == "csv":
+            # utf-8-sig para que Excel reconozca los acentos al abrir el CSV
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                df.iloc[0:0].to_csv(f, index=False)
+                for _, bloque in bloques():
+                    bloque.to_csv(f, index=False, header=False)
+
+        else:
+            from openpyxl import Workbook
+            wb = Workbook(write_only=True)  # Las filas van directo a disco
+            encabezado = [str(c) for c in df.columns]
+            filas_por_hoja = EXCEL_MAX_FILAS - 1
+            ws, en_hoja = None, filas_por_hoja
+            for _, bloque in bloques():
+                valores = bloque.astype(object).where(bloque.notna(), None)
+                for fila in valores.itertuples(index=False, name=None):
+                    if en_hoja == filas_por_hoja:
+                        ws = wb.create_sheet(f"Hoja{len(wb.worksheets) + 1}")
+                        ws.append(encabezado)
+                        en_hoja = 0
+                    ws.append(fila)
+                    en_hoja += 1
+            if ws is None:
+                wb.create_sheet("Hoja1").append(encabezado)
+            wb.save(path)
+
+    except _ExportacionCancelada:
+        try: os.remove(path)
+        except OSError: pass
+        return None
+
+    return total / max(time.perf_counter() - inicio, 1e-9)
+
+
+# --- RESUMEN AGREGADO ---
+# Conteos y sumas de montos por prestación, mes, prestador (y archivo en modo
+# biblioteca), calculados una sola vez al cargar. Las columnas se detectan por nombre.
+PATRONES_MONTO = ("monto", "valor", "total", "precio", "copago", "pago", "arancel")
+PATRONES_PRESTADOR = ("profesional", "prestador", "dentista", "doctor", "odontólogo", "odontologo", "tratante")
+
+
+def detectar_columnas_resumen(df):
+    """(columnas de monto, columna de fecha, columna de prestador) según nombre y tipo"""
+    def nombre(c):
+        return str(c).lower()
+
+    montos = [c for c in df.columns
+              if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])
+              and any(p in nombre(c) for p in PATRONES_MONTO)]
+    fechas = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    fecha = next((c for c in fechas if "fecha" in nombre(c)), fechas[0] if fechas else None)
+    prestador = next((c for c in df.columns if any(p in nombre(c) for p in PATRONES_PRESTADOR)), None)
+    return montos, fecha, prestador
+
+
+def calcular_resumen(df):
+    """Diccionario nombre -> tabla agregada (Registros + suma de cada monto)"""
+    montos, fecha, prestador = detectar_columnas_resumen(df)
+
+    def agrupar(claves):
+        grupos = df.groupby(claves, observed=True, sort=True)
+        tabla = grupos.size().rename("Registros").to_frame()
+        if montos:
+            tabla = tabla.join(grupos[montos].sum())
+        return tabla.reset_index()
+
+    tablas = {}
+    if "Prestación" in df.columns:
+        tablas["Por prestación"] = agrupar("Prestación").sort_values("Registros", ascending=False, kind="stable")
+    if fecha is not None:
+        tablas["Por mes"] = agrupar(df[fecha].dt.strftime("%Y-%m").rename("Mes"))
+    if prestador is not None:
+        tablas["Por prestador"] = agrupar(prestador).sort_values("Registros", ascending=False, kind="stable")
+    if COLUMNA_ORIGEN in df.columns:
+        tablas["Por archivo"] = agrupar(COLUMNA_ORIGEN)
+    return tablas
+
+
+def orden_columna(serie, descendente=False):
+    """Permutación estable de una columna del resultado: los empates conservan su orden
+    y los vacíos quedan al final en ambos sentidos"""
+    valores = serie.reset_index(drop=True)
+    if not (pd.api.types.is_numeric_dtype(valores) or pd.api.types.is_datetime64_any_dtype(valores)
+            or isinstance(valores.dtype, pd.CategoricalDtype)):
+        # Resultados del servidor llegan como texto: si todo es numérico, ordenar como número
+        numeros = pd.to_numeric(valores, errors="coerce")
+        if numeros.notna().sum() == valores.replace("", np.nan).notna().sum():
+            valores = numeros
+    try:
+        return valores.sort_values(ascending=not descendente, kind="stable", na_position="last").index.to_numpy()
+    except TypeError:
+        # Tipos mezclados (números y texto): orden de texto
+        texto = valores.astype(str).where(valores.notna())
+        return texto.sort_values(ascending=not descendente, kind="stable", na_position="last").index.to_numpy()
+
+
+# --- EXTRACCIÓN EN STREAMING ---
+# Para libros que casi no caben en memoria: se recorre la hoja fila a fila (openpyxl
+# read_only) y solo se guardan las filas de las prestaciones pedidas, en bloques.
+STREAMING_CHUNK_ROWS = 10000
+STREAMING_PROGRESO_FILAS = 5000
+
+
+def _clave_prestacion(valor):
+    """Texto de una celda de Prestación, igual al de pandas (read_excel + astype(str))"""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # read_excel convierte 101.0 en 101
+    return str(valor)
+
+
+def _nombres_columnas(encabezado):
+    """Nombres de columna como los arma pandas: "Unnamed: i" si está vacío, ".1", ".2" si se repite"""
+    nombres = []
+    vistos = {}
+    for i, valor in enumerate(encabezado):
+        nombre = f"Unnamed: {i}" if valor is None else valor
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+
+def extraer_prestaciones_streaming(archivo_path, prestaciones, progreso=None, cancelado=None, columnas=None,
+                                   criterios=()):
+    """Filas de las prestaciones pedidas sin cargar la hoja completa
+
+    Los criterios adicionales (como en MotorFiltros) se aplican a cada bloque.
+    Devuelve (DataFrame de coincidencias, prestaciones distintas del archivo, filas leídas),
+    o None si se canceló. La memoria crece con las coincidencias, no con el archivo.
+    """
+    from openpyxl import load_workbook
+
+    buscadas = {str(p) for p in prestaciones}
+    wb = load_workbook(archivo_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]  # Misma hoja que read_excel (sheet_name=0)
+        total = ws.max_row
+        filas = ws.iter_rows(values_only=True)
+        next(filas, None)  # Fila de título: los encabezados están en la fila 2 (header=1)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            raise Exception("La hoja está vacía.")
+
+        nombres = _nombres_columnas(encabezado)
+        if "Prestación" not in nombres:
+            raise Exception("Columna 'Prestación' no encontrada.")
+        i_prestacion = nombres.index("Prestación")
+        if columnas:
+            requeridas = set(columnas) | {"Prestación"}
+            conservar = [i for i, n in enumerate(nombres) if n in requeridas]
+        else:
+            conservar = list(range(len(nombres)))
+        nombres_salida = [nombres[i] for i in conservar]
+        criterios = normalizar_criterios(criterios)
+        for col, _, _ in criterios:
+            if col not in nombres_salida:
+                raise Exception(f"Columna del filtro no encontrada en el archivo: {col}")
+
+        def cerrar_bloque(bloque):
+            parte = pd.DataFrame.from_records(bloque, columns=nombres_salida, coerce_float=True)
+            parte = parte.fillna(np.nan).infer_objects()  # Celdas vacías como NaN, igual que read_excel
+            if criterios and len(parte):
+                # Los tipos de la máscara (fechas en texto, etc.) son los de la carga normal
+                tipado = compactar_dataframe(parte.copy())
+                mascara = np.ones(len(parte), dtype=bool)
+                for col, op, valor in criterios:
+                    mascara &= mascara_criterio(tipado, col, op, valor)
+                parte = parte[mascara]
+            return parte
+
+        bloques, bloque, distintas = [], [], set()
+        leidas = coincidencias = 0
+        for fila in filas:
+            if all(v is None for v in fila):
+                continue
+            leidas += 1
+            clave = _clave_prestacion(fila[i_prestacion] if i_prestacion < len(fila) else None)
+            if clave is not None:
+                distintas.add(clave)
+            if clave in buscadas:
+                bloque.append([fila[i] if i < len(fila) else None for i in conservar])
+                coincidencias += 1
+                if len(bloque) >= STREAMING_CHUNK_ROWS:
+                    bloques.append(cerrar_bloque(bloque))
+                    bloque = []
+
+            if leidas % STREAMING_PROGRESO_FILAS == 0:
+                if cancelado is not None and cancelado.is_set():
+                    return None
+                if progreso is not None:
+                    progreso(leidas / total if total else None, f"{leidas:,} filas leídas · {coincidencias:,} coincidencias")
+
+        if bloque or not bloques:
+            bloques.append(cerrar_bloque(bloque))
+        df = pd.concat(bloques, ignore_index=True) if len(bloques) > 1 else bloques[0].reset_index(drop=True)
+        # Se compacta una sola vez, sobre el resultado completo
+        return compactar_dataframe(df.infer_objects()), sorted(distintas), leidas
+    finally:
+        wb.close()
+
+
+# --- CACHÉ DE ARCHIVOS ---
+# Copia ya parseada de cada Excel (pickle) en la carpeta de datos. La clave incluye
+# tamaño y fecha de modificación, así que un xlsx modificado invalida su entrada.
+CACHE_DIRNAME = "cache"
+CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB, se eliminan primero las menos usadas
+
+
+def _cache_nombre(archivo_path, columnas=None):
+    """Nombre del archivo de caché: <hash de la ruta>_<hash de columnas>_<hash de tamaño+mtime>.pkl"""
+    st = os.stat(archivo_path)
+    ruta = os.path.normcase(os.path.abspath(archivo_path))
+    perfil = "|".join(sorted(str(c) for c in columnas)) if columnas else "*"
+    h_ruta = hashlib.sha1(ruta.encode("utf-8")).hexdigest()[:16]
+    h_perfil = hashlib.sha1(perfil.encode("utf-8")).hexdigest()[:8]
+    h_firma = hashlib.sha1(f"{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+    return f"{h_ruta}_{h_perfil}_{h_firma}.pkl"
+
+
+def _parsear_excel(archivo_path, columnas=None):
+    """pd.read_excel con el layout Vidasalud (header=1); con perfil solo lee esas columnas"""
+    if not columnas:
+        return pd.read_excel(archivo_path, engine="openpyxl", header=1)
+
+    requeridas = set(columnas) | {"Prestación"}
+    return pd.read_excel(
+        archivo_path,
+        engine="openpyxl",
+        header=1,
+        usecols=lambda c: c in requeridas,
+        dtype={"Prestación": str},  # La clave de filtrado siempre es texto
+    )
+
+
+def _leer_de_cache(archivo_path, cache_dir, columnas=None):
+    """DataFrame de la caché si la entrada existe y está vigente; si no, None"""
+    if cache_dir is None:
+        return None
+    cache_path = os.path.join(cache_dir, _cache_nombre(archivo_path, columnas))
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        df = pd.read_pickle(cache_path)
+        os.utime(cache_path, None)  # Marca de uso para el LRU
+        return df
+    except Exception:
+        return None  # Entrada corrupta: se vuelve a parsear
+
+
+def leer_excel(archivo_path, cache_dir=None, columnas=None):
+    """Lee el Excel, usando la caché persistente si el archivo no cambió"""
+    if cache_dir is None:
+        return compactar_dataframe(_parsear_excel(archivo_path, columnas))
+
+    df = _leer_de_cache(archivo_path, cache_dir, columnas)
+    if df is not None:
+        return df
+
+    df = compactar_dataframe(_parsear_excel(archivo_path, columnas))
+    try:
+        guardar_en_cache(df, cache_dir, _cache_nombre(archivo_path, columnas))
+    except Exception:
+        pass  # La caché es opcional; nunca debe impedir la carga
+    return df
+
+
+def guardar_en_cache(df, cache_dir, nombre):
+    if not os.path.exists(cache_dir): os.makedirs(cache_dir)
+
+    # Entradas del mismo archivo con otra firma (tamaño/mtime) ya no sirven; las de
+    # otros perfiles con la misma firma (lectura completa vs. proyectada) siguen vigentes
+    prefijo = nombre.split("_")[0] + "_"
+    firma = nombre.rsplit("_", 1)[1]
+    for viejo in glob.glob(os.path.join(cache_dir, prefijo + "*.pkl")):
+        if os.path.basename(viejo).rsplit("_", 1)[1] != firma:
+            try: os.remove(viejo)
+            except OSError: pass
+
+    destino = os.path.join(cache_dir, nombre)
+    # Temporal propio: precarga, pool de la biblioteca y la interfaz pueden escribir la misma entrada a la vez
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=nombre + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_pickle(tmp)
+        os.replace(tmp, destino)  # Escritura atómica
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    podar_cache(cache_dir)
+
+
+def podar_cache(cache_dir, max_bytes=CACHE_MAX_BYTES):
+    """Elimina las entradas usadas hace más tiempo hasta quedar bajo el límite"""
+    entradas = []
+    for path in glob.glob(os.path.join(cache_dir, "*.pkl")):
+        try:
+            st = os.stat(path)
+            entradas.append((st.st_mtime, st.st_size, path))
+        except OSError:
+            pass
+
+    total = sum(size for _, size, _ in entradas)
+    for _, size, path in sorted(entradas):
+        if total <= max_bytes: break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+# --- MANIFIESTO DE BIBLIOTECA ---
+# Estado conocido de archivos_excel (tamaño, mtime, hash de contenido) para detectar
+# archivos nuevos, modificados o eliminados sin reparsear nada que no haya cambiado.
+MANIFIESTO_FILENAME = "manifiesto.json"
+RESCAN_INTERVAL_MS = 60 * 1000
+
+
+def listar_xlsx(carpeta):
+    """Archivos .xlsx de la carpeta, sin los temporales de bloqueo de Excel (~$...)"""
+    return sorted(p for p in glob.glob(os.path.join(carpeta, "*.xlsx"))
+                  if not os.path.basename(p).startswith("~$"))
+
+
+def hash_archivo(path, bloque=1024 * 1024):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def cargar_manifiesto(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFIESTO_FILENAME), encoding="utf-8") as f:
+            manifiesto = json.load(f)
+        return manifiesto if isinstance(manifiesto, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_manifiesto(cache_dir, manifiesto):
+    if not os.path.exists(cache_dir): os.makedirs(cache_dir)
+    path = os.path.join(cache_dir, MANIFIESTO_FILENAME)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=MANIFIESTO_FILENAME + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+
+def escanear_biblioteca(carpeta, manifiesto):
+    """Compara la carpeta con el manifiesto; devuelve (manifiesto nuevo, cambios)
+
+    Solo se calcula el hash de los archivos cuyo tamaño o mtime cambió. "tocados" son
+    los que cambiaron de mtime con el mismo contenido: no son cambios para el usuario,
+    pero su entrada de caché (que depende del mtime) hay que regenerarla igual.
+    """
+    nuevo = {}
+    cambios = {"agregados": [], "modificados": [], "tocados": [], "eliminados": []}
+    for path in listar_xlsx(carpeta):
+        try:
+            st = os.stat(path)
+            previo = manifiesto.get(path)
+            if previo and previo["size"] == st.st_size and previo["mtime"] == st.st_mtime_ns:
+                nuevo[path] = previo
+                continue
+            nuevo[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": hash_archivo(path)}
+        except OSError:
+            continue  # Se está copiando o se borró durante el escaneo
+
+        if previo is None:
+            cambios["agregados"].append(path)
+        elif previo.get("hash") != nuevo[path]["hash"]:
+            cambios["modificados"].append(path)
+        else:
+            cambios["tocados"].append(path)
+
+    cambios["eliminados"] = sorted(set(manifiesto) - set(nuevo))
+    return nuevo, cambios
+
+
+def pendientes_de_precarga(nuevo, cambios):
+    """Archivos a dejar en caché, los más recientes primero (son los que el usuario abrirá antes)"""
+    pendientes = cambios["agregados"] + cambios["modificados"] + cambios["tocados"]
+    return sorted(pendientes, key=lambda p: nuevo[p]["mtime"], reverse=True)
+
+
+def manifiesto_sin_pendientes(previo, nuevo, pendientes):
+    """Manifiesto a guardar antes de precargar: los pendientes conservan su entrada anterior
+    (o ninguna) hasta que precargar_archivos los registra ya en caché"""
+    pendientes = set(pendientes)
+    manifiesto = {p: e for p, e in nuevo.items() if p not in pendientes}
+    manifiesto.update({p: previo[p] for p in pendientes if p in previo})
+    return manifiesto
+
+
+def precargar_archivos(archivos, cache_dir, columnas=None, entradas=None):
+    """Parsea los archivos (en un proceso aparte) solo para dejarlos en la caché
+
+    entradas: {path: entrada del manifiesto}. Cada una se registra recién cuando su
+    archivo quedó procesado; si la precarga se interrumpe (p. ej. al cerrar la app),
+    los que faltaban siguen pendientes en el próximo escaneo.
+    """
+    for path in archivos:
+        try:
+            leer_excel(path, cache_dir, columnas)
+        except Exception:
+            pass  # Se informará cuando el usuario lo abra; no se reintenta en cada escaneo
+        if entradas is not None and path in entradas:
+            manifiesto = cargar_manifiesto(cache_dir)
+            manifiesto[path] = entradas[path]
+            guardar_manifiesto(cache_dir, manifiesto)
+
+
+# --- INSTRUMENTACIÓN ---
+# Cada operación (carga, filtro, render, exportación) deja un registro JSON por línea
+# en <datos>/logs/rendimiento.jsonl (rotativo). Con perfilado activo, además un .prof
+# de cProfile por operación, para abrir con pstats/snakeviz.
+PERF_LOG_DIRNAME = "logs"
+PERF_LOG_FILENAME = "rendimiento.jsonl"
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+PERF_LOG_BACKUPS = 3
+
+_perf_logger = None
+
+
+def get_perf_log_path():
+    return os.path.join(get_data_path(), PERF_LOG_DIRNAME)
+
+
+def _get_perf_logger():
+    global _perf_logger
+    if _perf_logger is None:
+        logger = logging.getLogger("vidasalud.rendimiento")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            log_dir = get_perf_log_path()
+            if not os.path.exists(log_dir): os.makedirs(log_dir)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, PERF_LOG_FILENAME),
+                maxBytes=PERF_LOG_MAX_BYTES,
+                backupCount=PERF_LOG_BACKUPS,
+                encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        except OSError:
+            logger.addHandler(logging.NullHandler())  # Sin log, pero la app sigue funcionando
+        _perf_logger = logger
+    return _perf_logger
+
+
+# Muestreo de la memoria residente mientras dura cada operación (pico por operación)
+MEMORIA_MUESTREO_S = 0.05
+
+
+def memoria_actual_mb():
+    """Memoria residente actual del proceso en MB (None si no se puede obtener)"""
+    try:
+        if sys.platform == "win32":
+            return _contadores_memoria_windows().WorkingSetSize / (1024 * 1024)
+        if sys.platform == "darwin":
+            return _residente_darwin() / (1024 * 1024)
+        with open("/proc/self/statm") as f:
+            residentes = int(f.read().split()[1])
+        return residentes * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        return None
+
+
+_task_info_darwin = None
+
+
+def _residente_darwin():
+    """resident_size de task_info(MACH_TASK_BASIC_INFO), en bytes"""
+    global _task_info_darwin
+    import ctypes
+
+    class MachTaskBasicInfo(ctypes.Structure):
+        _pack_ = 4  # #pragma pack(4) en <mach/task_info.h>
+        _fields_ = [("virtual_size", ctypes.c_uint64), ("resident_size", ctypes.c_uint64),
+                    ("resident_size_max", ctypes.c_uint64), ("user_time", ctypes.c_int32 * 2),
+                    ("system_time", ctypes.c_int32 * 2), ("policy", ctypes.c_int32),
+                    ("suspend_count", ctypes.c_int32)]
+
+    if _task_info_darwin is None:
+        libc = ctypes.CDLL("/usr/lib/libSystem.B.dylib")
+        libc.task_info.argtypes = [ctypes.c_uint32, ctypes.c_int32, ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)]
+        libc.task_info.restype = ctypes.c_int
+        _task_info_darwin = (libc.task_info, ctypes.c_uint32.in_dll(libc, "mach_task_self_").value)
+
+    task_info, tarea = _task_info_darwin
+    info = MachTaskBasicInfo()
+    cantidad = ctypes.c_uint32(ctypes.sizeof(info) // 4)  # MACH_TASK_BASIC_INFO_COUNT (en natural_t)
+    if task_info(tarea, 20, ctypes.byref(info), ctypes.byref(cantidad)) != 0:  # 20 = MACH_TASK_BASIC_INFO
+        raise OSError("task_info")
+    return info.resident_size
+
+
+def _contadores_memoria_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    contadores = PROCESS_MEMORY_COUNTERS()
+    contadores.cb = ctypes.sizeof(contadores)
+    proceso = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+        raise OSError("GetProcessMemoryInfo")
+    return contadores
+
+
+def memoria_pico_mb():
+    """Pico de memoria residente de toda la vida del proceso en MB (None si no se puede obtener)"""
+    try:
+        if sys.platform == "win32":
+            return _contadores_memoria_windows().PeakWorkingSetSize / (1024 * 1024)
+
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS informa bytes; Linux, kilobytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except Exception:
+        return None
+
+
+def _redondear(valor, decimales=1):
+    return None if valor is None else round(valor, decimales)
+
+
+class Medicion:
+    """Context manager que mide una operación y la agrega al log de rendimiento
+
+    Memoria por operación: residente antes/después, su diferencia y el pico (un hilo
+    la muestrea cada MEMORIA_MUESTREO_S). Con perfilado activo, además el pico de
+    asignaciones de Python (tracemalloc; solo entonces, porque las hace más lentas).
+    """
+
+    def __init__(self, operacion, perfilar=False, **datos):
+        self.operacion = operacion
+        self.perfilar = perfilar
+        self.datos = datos
+        self.filas = None
+        self.registro = None
+        self._perfil = None
+        self._tracemalloc_propio = False
+        self._fin_muestreo = threading.Event()
+        self._muestreo = None
+        self._pico_residente = None
+
+    def _muestrear(self):
+        while not self._fin_muestreo.wait(MEMORIA_MUESTREO_S):
+            actual = memoria_actual_mb()
+            if actual is not None and (self._pico_residente is None or actual > self._pico_residente):
+                self._pico_residente = actual
+
+    def __enter__(self):
+        if self.perfilar:
+            try:
+                self._perfil = cProfile.Profile()
+                self._perfil.enable()
+            except ValueError:
+                self._perfil = None  # Otro perfilador ya activo en este hilo
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc_propio = True
+            tracemalloc.reset_peak()
+        self._memoria_inicio = self._pico_residente = memoria_actual_mb()
+        if self._memoria_inicio is not None:
+            self._muestreo = threading.Thread(target=self._muestrear, daemon=True)
+            self._muestreo.start()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duracion = time.perf_counter() - self._inicio
+        if self._perfil is not None:
+            self._perfil.disable()
+        if self._muestreo is not None:
+            self._fin_muestreo.set()
+            self._muestreo.join()
+        memoria_fin = memoria_actual_mb()
+        pico_asignaciones = None
+        if self.perfilar:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                pico_asignaciones = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                if self._tracemalloc_propio:
+                    tracemalloc.stop()
+
+        delta = pico = None
+        if self._memoria_inicio is not None and memoria_fin is not None:
+            delta = memoria_fin - self._memoria_inicio
+            pico = max(self._pico_residente, memoria_fin)
+        self.registro = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "operacion": self.operacion,
+            "duracion_s": round(duracion, 4),
+            "filas": self.filas,
+            "memoria_inicio_mb": _redondear(self._memoria_inicio),
+            "memoria_fin_mb": _redondear(memoria_fin),
+            "memoria_delta_mb": _redondear(delta),
+            "memoria_pico_operacion_mb": _redondear(pico),
+            "memoria_pico_asignaciones_mb": _redondear(pico_asignaciones),
+            "memoria_pico_proceso_mb": _redondear(memoria_pico_mb()),  # Desde que arrancó el proceso
+            **self.datos,
+        }
+        if exc is not None:
+            self.registro["error"] = str(exc)
+
+        try:
+            logger = _get_perf_logger()  # Crea la carpeta de logs si hace falta
+            if self._perfil is not None:
+                nombre = f"perfil_{self.operacion}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+                path = os.path.join(get_perf_log_path(), nombre)
+                self._perfil.dump_stats(path)
+                self.registro["perfil"] = path
+            logger.info(json.dumps(self.registro, ensure_ascii=False, default=str))
+        except Exception:
+            pass  # La instrumentación nunca debe romper la operación medida
+        return False
+
+    def resumen(self):
+        """Texto corto para la barra de estado"""
+        r = self.registro
+        texto = f"⏱ {r['operacion']}: {r['duracion_s']:.2f} s"
+        if r["filas"] is not None:
+            texto += f" · {r['filas']:,} filas"
+        if r["memoria_delta_mb"] is not None:
+            texto += f" · memoria {r['memoria_delta_mb']:+,.0f} MB"
+        if r["memoria_pico_operacion_mb"] is not None:
+            texto += f" · pico {r['memoria_pico_operacion_mb']:,.0f} MB"
+        if r["memoria_pico_asignaciones_mb"] is not None:
+            texto += f" (Python {r['memoria_pico_asignaciones_mb']:,.0f} MB)"
+        return texto
+
+
+# --- RUTAS ---
+
+def get_base_path():
+    """Returns executable/script directory"""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    else:
+        return os.path.dirname(os.path.abspath(__file__))
+
+
+def get_data_path():
+    """Returns safe data directory (Documents on Mac)"""
+    if sys.platform == "darwin" and getattr(sys, "frozen", False):
+        docs = os.path.join(os.path.expanduser("~"), "Documents")
+        data_dir = os.path.join(docs, "Vidasalud_Data")
+        if not os.path.exists(data_dir):
+            try: os.makedirs(data_dir)
+            except: pass
+        return data_dir
+    else:
+        return get_base_path()
+
+
+def get_library_path():
+    """Returns the archivos_excel library folder"""
+    return os.path.join(get_data_path(), "archivos_excel")
+
+
+def get_cache_path():
+    """Returns the parsed-workbook cache directory"""
+    return os.path.join(get_data_path(), CACHE_DIRNAME)
+
+
+def get_export_path():
+    """Returns the export folder (Documents/Vidasalud_Export), creating it if needed"""
+    docs = os.path.join(os.path.expanduser("~"), "Documents")
+    out_dir = os.path.join(docs, "Vidasalud_Export")
+    if not os.path.exists(out_dir): os.makedirs(out_dir)
+    return out_dir
+
+
+# --- CONFIGURACIÓN PERSISTENTE ---
+# vidasalud_config.json en la carpeta de datos. Claves:
+#   "perfil_columnas": columnas a leer al cargar (además de "Prestación")
+CONFIG_FILENAME = "vidasalud_config.json"
+
+
+def cargar_config():
+    try:
+        with open(os.path.join(get_data_path(), CONFIG_FILENAME), encoding="utf-8") as f:
+            config = json.load(f)
+        return config if isinstance(config, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_config(config):
+    path = os.path.join(get_data_path(), CONFIG_FILENAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+# Caracteres no válidos en nombres de archivo de Windows (también / y controles)
+_CARACTERES_INVALIDOS = re.compile(r'[<>:"/\\|?*\x00-\x1f\s]')
+
+
+def limpiar_nombre_archivo(texto):
+    """Texto apto para nombre de archivo en cualquier sistema"""
+    return _CARACTERES_INVALIDOS.sub("_", str(texto)).rstrip(". ") or "_"
+
+
+def nombre_exportacion(archivo, suffix, formato):
+    """VS_<archivo>_<suffix>_<timestamp>.<formato>"""
+    archivo_base = os.path.splitext(archivo)[0]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"VS_{limpiar_nombre_archivo(archivo_base)}_{limpiar_nombre_archivo(suffix)}_{timestamp}.{formato}"
+
+
+def ruta_unica(path):
+    """path si no existe; si no, path con _2, _3... antes de la extensión"""
+    base, extension = os.path.splitext(path)
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = f"{base}_{n}{extension}"
+    return path
+
 
 class FiltradorMultiArchivosGUI:
     def __init__(self, root):
@@ -57,33 +1189,88 @@ class FiltradorMultiArchivosGUI:
         self.archivo_seleccionado = None
         self.df = None
         self.prestaciones = []
+        self.indice_prestaciones = {}  # Prestación -> posiciones de fila en self.df
+        self._indice_busqueda = None
+        self._busqueda_pendiente = None
+        self.motor_filtros = None
+        self.resumen = {}  # Tablas agregadas calculadas al cargar
+        self.total_registros = 0
+
+        # Modo cliente: los datos viven en un servidor de consultas compartido
+        self.cliente = None
+        self._columnas_remotas = []
+        self._hilo_paginas = None  # Descarga de páginas de un ResultadoRemoto para la grilla
+
+        # Extracción directa: archivo recorrido en streaming (sin self.df completo)
+        self._archivo_streaming = None
+        self._columnas_streaming = []
+        self.criterios_extra = []  # Criterios de "Filtros Avanzados" (además de la prestación)
         self.resultado_filtrado = None
         self.columnas_seleccionadas = []
 
+        # Perfil de columnas persistente: si existe, solo esas columnas se leen del Excel
+        self.perfil_columnas = cargar_config().get("perfil_columnas") or []
+        if self.perfil_columnas:
+            self.columnas_seleccionadas = list(self.perfil_columnas)
+
+        # Estado de la grilla virtual
+        self._vista_df = None
+        self._vista_columnas = None
+        self._vista_offset = 0
+        self._vista_filas_visibles = 20
+        self._vista_items = []
+        self._vista_orden = None      # Permutación de filas mostrada (None = orden original)
+        self._ordenes_cache = {}      # (posición de columna, descendente) -> permutación
+        self._orden_actual = None     # (posición de columna, descendente)
+
+        # Tarea en segundo plano activa (solo una a la vez)
+        self._tarea = None
+        self._estados_previos = {}
+
+        # Instrumentación: última medición (la escriben los hilos de tarea) y perfilado
+        self._ultima_medicion = None
+        self.perfilar = os.environ.get("VIDASALUD_PROFILE") == "1"
+
         # Layout Setup
         self.setup_ui()
         
+        # El escaneo de la carpeta y los módulos pesados esperan a la primera pintura
+        self._arranque = {"ventana_creada_s": round(time.perf_counter() - _T_INICIO, 4)}
+        self.root.after_idle(self._primera_pintura)
+
+        # Reescaneo periódico de la biblioteca con precarga de lo que cambió
+        self._escaneo = None
+        self.root.after(2000, self._reescaneo_periodico)
+
+    # --- ARRANQUE ---
+
+    def _primera_pintura(self):
+        self._arranque["primera_pintura_s"] = round(time.perf_counter() - _T_INICIO, 4)
+        self.root.after(INICIO_DIFERIDO_MS, self._inicio_diferido)
+
+    def _inicio_diferido(self):
         # Load files initially
         self.cargar_archivos_disponibles()
+        self._arranque["interactivo_s"] = round(time.perf_counter() - _T_INICIO, 4)
+
+        def precargar_modulos():
+            for nombre in MODULOS_PRECARGA:
+                try: _importar_medido(nombre)
+                except ImportError: pass
+            self._arranque["modulos_listos_s"] = round(time.perf_counter() - _T_INICIO, 4)
+            registrar_arranque(self._arranque)
+
+        # Con la ventana ya visible, pandas se importa en segundo plano para el primer clic
+        threading.Thread(target=precargar_modulos, daemon=True).start()
 
     def get_base_path(self):
-        """Returns executable/script directory"""
-        if getattr(sys, "frozen", False):
-            return os.path.dirname(sys.executable)
-        else:
-            return os.path.dirname(os.path.abspath(__file__))
+        return get_base_path()
 
     def get_data_path(self):
-        """Returns safe data directory (Documents on Mac)"""
-        if sys.platform == "darwin" and getattr(sys, "frozen", False):
-            docs = os.path.join(os.path.expanduser("~"), "Documents")
-            data_dir = os.path.join(docs, "Vidasalud_Data")
-            if not os.path.exists(data_dir):
-                try: os.makedirs(data_dir)
-                except: pass
-            return data_dir
-        else:
-            return self.get_base_path()
+        return get_data_path()
+
+    def get_cache_path(self):
+        return get_cache_path()
 
     def setup_ui(self):
         """Construye la interfaz moderna"""
@@ -127,6 +1314,11 @@ class FiltradorMultiArchivosGUI:
         # Switch de Tema
         self.theme_switch = ctk.CTkSwitch(self.header, text="Modo Oscuro", command=self.toggle_theme)
         self.theme_switch.pack(side="right", padx=30)
+
+        # Perfilado profundo (cProfile) de cada operación, para diagnósticos
+        self.profile_switch = ctk.CTkSwitch(self.header, text="Perfilado", command=self.toggle_perfilado)
+        self.profile_switch.pack(side="right", padx=10)
+        if self.perfilar: self.profile_switch.select()
     
         # --- 2. CONTENIDO PRINCIPAL ---
         self.content_frame = ctk.CTkFrame(self.root, corner_radius=0, fg_color="transparent")
@@ -155,6 +1347,51 @@ class FiltradorMultiArchivosGUI:
         )
         self.btn_load.pack(fill="x", padx=20, pady=5)
 
+        self.btn_load_library = ctk.CTkButton(
+            self.sidebar, 
+            text="📚 Cargar Biblioteca Completa", 
+            command=self.cargar_biblioteca_completa,
+            height=35,
+            corner_radius=8,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray20", "gray80")
+        )
+        self.btn_load_library.pack(fill="x", padx=20, pady=5)
+
+        self.btn_connect = ctk.CTkButton(
+            self.sidebar, 
+            text="🌐 Conectar a Servidor", 
+            command=self.conectar_servidor,
+            height=35,
+            corner_radius=8,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray20", "gray80")
+        )
+        self.btn_connect.pack(fill="x", padx=20, pady=5)
+
+        self.btn_rescan = ctk.CTkButton(
+            self.sidebar,
+            text="🔄 Reescanear Biblioteca",
+            command=self.reescanear_biblioteca,
+            height=28,
+            fg_color="transparent",
+            text_color=("gray20", "gray80"),
+            hover_color=("gray85", "gray25")
+        )
+        self.btn_rescan.pack(fill="x", padx=20, pady=(0, 5))
+
+        self.lbl_biblioteca = ctk.CTkLabel(
+            self.sidebar,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color=self.colors["text_sec"],
+            wraplength=280,
+            justify="left"
+        )
+        self.lbl_biblioteca.pack(anchor="w", padx=20)
+
         self.lbl_current_file = ctk.CTkLabel(
             self.sidebar, 
             text="Ningún archivo seleccionado", 
@@ -163,7 +1400,36 @@ class FiltradorMultiArchivosGUI:
             wraplength=280,
             justify="left"
         )
-        self.lbl_current_file.pack(anchor="w", padx=20, pady=10)
+        self.lbl_current_file.pack(anchor="w", padx=20, pady=(10, 0))
+
+        # Tiempo de la última operación (instrumentación)
+        self.lbl_rendimiento = ctk.CTkLabel(
+            self.sidebar,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color=self.colors["text_sec"],
+            wraplength=280,
+            justify="left"
+        )
+        self.lbl_rendimiento.pack(anchor="w", padx=20, pady=(0, 10))
+
+        # Indicador de tarea en segundo plano (solo visible mientras hay trabajo)
+        self.task_frame = ctk.CTkFrame(self.sidebar, fg_color="transparent")
+        self.lbl_task = ctk.CTkLabel(self.task_frame, text="", font=ctk.CTkFont(size=11), text_color=self.colors["text_sec"], anchor="w")
+        self.lbl_task.pack(fill="x")
+        self.progress_task = ctk.CTkProgressBar(self.task_frame, mode="indeterminate", height=8)
+        self.progress_task.pack(fill="x", pady=(2, 6))
+        self.btn_cancel = ctk.CTkButton(
+            self.task_frame,
+            text="✖ Cancelar",
+            command=self.cancelar_tarea,
+            height=28,
+            fg_color="transparent",
+            border_width=1,
+            border_color=self.colors["danger"],
+            text_color=self.colors["danger"]
+        )
+        self.btn_cancel.pack(fill="x")
 
         # Separador
         ctk.CTkFrame(self.sidebar, height=2, fg_color=self.colors["bg_color"][0] if ctk.get_appearance_mode()=="Light" else "gray30").pack(fill="x", padx=20, pady=15)
@@ -190,6 +1456,28 @@ class FiltradorMultiArchivosGUI:
         )
         self.btn_apply_filter.pack(fill="x", padx=20, pady=10)
 
+        self.btn_stream_extract = ctk.CTkButton(
+            self.sidebar, 
+            text="⚡ Extracción Directa (archivos grandes)", 
+            command=self.extraer_directo,
+            height=35,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray20", "gray80")
+        )
+        self.btn_stream_extract.pack(fill="x", padx=20, pady=(0, 10))
+
+        self.btn_advanced_filter = ctk.CTkButton(
+            self.sidebar, 
+            text="🧩 Filtros Avanzados", 
+            command=self.configurar_filtros,
+            height=35,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray20", "gray80")
+        )
+        self.btn_advanced_filter.pack(fill="x", padx=20, pady=(0, 10))
+
         self.btn_clear = ctk.CTkButton(
             self.sidebar, 
             text="🧹 Limpiar Filtros", 
@@ -210,7 +1498,15 @@ class FiltradorMultiArchivosGUI:
             font=ctk.CTkFont(size=14, weight="bold"),
             state="disabled"
         )
-        self.btn_save.pack(side="bottom", fill="x", padx=20, pady=30)
+        self.btn_save.pack(side="bottom", fill="x", padx=20, pady=(10, 30))
+
+        self.export_format_var = tk.StringVar(value=FORMATOS_EXPORTACION[0])
+        self.seg_export_format = ctk.CTkSegmentedButton(
+            self.sidebar,
+            values=FORMATOS_EXPORTACION,
+            variable=self.export_format_var
+        )
+        self.seg_export_format.pack(side="bottom", fill="x", padx=20)
 
 
         # --- ÁREA PRINCIPAL ---
@@ -235,6 +1531,7 @@ class FiltradorMultiArchivosGUI:
         self.stat_total_var = tk.StringVar(value="0")
         self.stat_filtro_var = tk.StringVar(value="0")
         self.stat_perc_var = tk.StringVar(value="0%")
+        self.stat_mem_var = tk.StringVar(value="0 MB")
 
         create_stat_widget(self.stats_frame, "REGISTROS TOTALES", self.stat_total_var, self.colors["text_main"][0])
         # Separador vertical
@@ -243,6 +1540,9 @@ class FiltradorMultiArchivosGUI:
         # Separador vertical
         ctk.CTkFrame(self.stats_frame, width=2, height=40, fg_color="gray80").pack(side="left", pady=20)
         create_stat_widget(self.stats_frame, "PORCENTAJE", self.stat_perc_var, self.colors["success"])
+        # Separador vertical
+        ctk.CTkFrame(self.stats_frame, width=2, height=40, fg_color="gray80").pack(side="left", pady=20)
+        create_stat_widget(self.stats_frame, "MEMORIA EN USO", self.stat_mem_var, self.colors["text_sec"][0])
 
 
         # 2. Barra Superior de Tabla
@@ -263,6 +1563,17 @@ class FiltradorMultiArchivosGUI:
         )
         self.btn_columns.pack(side="right")
 
+        self.btn_summary = ctk.CTkButton(
+            self.table_header, 
+            text="📊 Resumen", 
+            width=120, 
+            command=self.mostrar_resumen,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray10", "gray90")
+        )
+        self.btn_summary.pack(side="right", padx=(0, 10))
+
         # 3. Tabla (Treeview)
         self.tree_container = ctk.CTkFrame(self.main_area_container, corner_radius=15, fg_color=self.colors["card_bg"])
         self.tree_container.grid(row=2, column=0, sticky="nsew")
@@ -276,7 +1587,7 @@ class FiltradorMultiArchivosGUI:
         style.configure("Treeview", 
             background="white",
             foreground="#333333",
-            rowheight=35,
+            rowheight=TREE_ROW_HEIGHT,
             fieldbackground="white",
             bordercolor="#E5E5E5",
             borderwidth=0,
@@ -296,17 +1607,24 @@ class FiltradorMultiArchivosGUI:
         self.tree_scroll_x = ctk.CTkScrollbar(self.tree_frame, orientation="horizontal")
         self.tree_scroll_x.pack(side="bottom", fill="x")
 
+        # La barra vertical no sigue al Treeview: recorre el DataFrame (grilla virtual)
         self.tree = ttk.Treeview(
             self.tree_frame, 
             show="headings", 
-            yscrollcommand=self.tree_scroll_y.set, 
             xscrollcommand=self.tree_scroll_x.set
         )
         self.tree.pack(fill="both", expand=True)
         
-        self.tree_scroll_y.configure(command=self.tree.yview)
+        self.tree_scroll_y.configure(command=self._scroll_vista)
         self.tree_scroll_x.configure(command=self.tree.xview)
 
+        self.tree.bind("<Configure>", self._on_tree_configure)
+        self.tree.bind("<MouseWheel>", self._on_tree_mousewheel)
+        self.tree.bind("<Button-4>", self._on_tree_mousewheel)
+        self.tree.bind("<Button-5>", self._on_tree_mousewheel)
+        self.tree.bind("<Prior>", lambda e: self._scroll_vista("scroll", -1, "pages") or "break")
+        self.tree.bind("<Next>", lambda e: self._scroll_vista("scroll", 1, "pages") or "break")
+
 
     # --- LOGIC METHODS (Adatped from original) ---
 
@@ -316,104 +1634,577 @@ class FiltradorMultiArchivosGUI:
         else:
             ctk.set_appearance_mode("Dark")
 
+    def toggle_perfilado(self):
+        self.perfilar = bool(self.profile_switch.get())
+
+    def _medir(self, operacion, **datos):
+        """Medicion que además queda como la última operación mostrada en la barra lateral"""
+        medicion = Medicion(operacion, perfilar=self.perfilar, **datos)
+        self._ultima_medicion = medicion
+        return medicion
+
+    def _mostrar_medicion(self):
+        medicion = self._ultima_medicion
+        if medicion is not None and medicion.registro is not None:
+            self.lbl_rendimiento.configure(text=medicion.resumen())
+
     def cargar_archivos_disponibles(self):
-        base_path = self.get_data_path()
-        carpeta_archivos = os.path.join(base_path, "archivos_excel")
+        carpeta_archivos = get_library_path()
         if not os.path.exists(carpeta_archivos):
             try: os.makedirs(carpeta_archivos)
             except: pass
             
-        patron = os.path.join(carpeta_archivos, "*.xlsx")
-        self.archivos_excel = glob.glob(patron)
+        self.archivos_excel = listar_xlsx(carpeta_archivos)
         if self.archivos_excel:
             self.lbl_current_file.configure(text=f"{len(self.archivos_excel)} archivos encontrados en la biblioteca.")
         else:
             self.lbl_current_file.configure(text="No se encontraron archivos en la carpeta.")
 
+    def _reescaneo_periodico(self):
+        self.reescanear_biblioteca()
+        self.root.after(RESCAN_INTERVAL_MS, self._reescaneo_periodico)
+
+    def reescanear_biblioteca(self):
+        """Detecta cambios en archivos_excel y precarga en caché los archivos nuevos o modificados"""
+        if self._escaneo is not None and self._escaneo.is_alive(): return
+
+        carpeta = get_library_path()
+        cache_dir = self.get_cache_path()
+        columnas = list(self.perfil_columnas)
+        estado = {"fase": "escaneando", "archivos": None, "cambios": None, "pendientes": 0, "error": None}
+
+        def worker():
+            try:
+                previo = cargar_manifiesto(cache_dir)
+                nuevo, cambios = escanear_biblioteca(carpeta, previo)
+                estado["archivos"] = sorted(nuevo)
+                estado["cambios"] = cambios
+
+                pendientes = pendientes_de_precarga(nuevo, cambios)
+                guardar_manifiesto(cache_dir, manifiesto_sin_pendientes(previo, nuevo, pendientes))
+
+                if pendientes:
+                    estado["pendientes"] = len(pendientes)
+                    estado["fase"] = "precargando"
+                    # Proceso daemon: no compite por el GIL con la interfaz y muere al cerrar la app
+                    entradas = {p: nuevo[p] for p in pendientes}
+                    proceso = multiprocessing.Process(target=precargar_archivos, args=(pendientes, cache_dir, columnas, entradas), daemon=True)
+                    proceso.start()
+                    proceso.join()
+            except Exception as e:
+                estado["error"] = str(e)
+            estado["fase"] = "listo"
+
+        self.lbl_biblioteca.configure(text="Escaneando biblioteca...")
+        self._escaneo = threading.Thread(target=worker, daemon=True)
+        self._escaneo.start()
+        self.root.after(POLL_MS, self._revisar_escaneo, estado)
+
+    def _revisar_escaneo(self, estado):
+        fase = estado["fase"]
+        if estado["error"] is not None:
+            self.lbl_biblioteca.configure(text=f"Error al escanear: {estado['error']}")
+            return
+
+        if estado["cambios"] is not None:
+            self.archivos_excel = estado["archivos"]
+            cambios = estado["cambios"]
+            texto = f"Biblioteca: {len(self.archivos_excel)} archivos"
+            detalle = [f"{len(cambios[k])} {k}" for k in ("agregados", "modificados", "eliminados") if cambios[k]]
+            if detalle:
+                texto += " · " + ", ".join(detalle)
+            if fase == "precargando":
+                texto += f"\nPrecargando {estado['pendientes']} archivo(s)..."
+            self.lbl_biblioteca.configure(text=texto)
+
+        if fase != "listo":
+            self.root.after(POLL_MS * 5, self._revisar_escaneo, estado)
+
     def cargar_archivo(self):
         archivo_path = filedialog.askopenfilename(
             title="Seleccionar archivo Excel",
             filetypes=[("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*")],
-            initialdir=os.path.join(self.get_data_path(), "archivos_excel"),
+            initialdir=get_library_path(),
         )
         if not archivo_path: return
 
-        try:
-            self.df = pd.read_excel(archivo_path, engine="openpyxl", header=1)
-            self.archivo_seleccionado = os.path.basename(archivo_path)
+        nombre = os.path.basename(archivo_path)
+        cache_dir = self.get_cache_path()
+        columnas = list(self.perfil_columnas)
+
+        def tarea(progreso, cancelado):
+            progreso(texto=f"Leyendo {nombre}...")
+            with self._medir("cargar_archivo", archivo=nombre) as medicion:
+                datos = self._preparar_datos(leer_excel(archivo_path, cache_dir, columnas), progreso)
+                medicion.filas = len(datos["df"])
+            return datos
+
+        def listo(resultado):
+            self._datos_cargados(resultado, nombre, f"Cargado: {nombre}")
+
+        self.ejecutar_en_segundo_plano("Cargando archivo", tarea, listo)
+
+    def cargar_biblioteca_completa(self):
+        self.cargar_archivos_disponibles()
+        archivos = sorted(self.archivos_excel)
+        if not archivos:
+            messagebox.showinfo("Biblioteca", "No hay archivos .xlsx en la carpeta archivos_excel.")
+            return
+
+        cache_dir = self.get_cache_path()
+        columnas = list(self.perfil_columnas)
+
+        def tarea(progreso, cancelado):
+            progreso(0.0, f"0/{len(archivos)} archivos leídos")
+            with self._medir("cargar_biblioteca", archivos=len(archivos)) as medicion:
+                df = cargar_biblioteca(archivos, cache_dir, progreso, cancelado, columnas)
+                if df is None: return None
+                datos = self._preparar_datos(df, progreso)
+                medicion.filas = len(df)
+            return datos
+
+        def listo(resultado):
+            self._datos_cargados(resultado, "Biblioteca", f"Biblioteca: {len(archivos)} archivos cargados")
+
+        self.ejecutar_en_segundo_plano("Cargando biblioteca", tarea, listo)
+
+    def _preparar_datos(self, df, progreso):
+        """Trabajo posterior a la lectura (en el hilo de la tarea): compactación e índices"""
+        progreso(texto="Optimizando memoria...")
+        df = compactar_dataframe(df)
+        datos = {"df": df, "memoria": df.memory_usage(deep=True).sum(),
+                 "prestaciones": [], "indice": {}, "indice_busqueda": None}
+        if "Prestación" in df.columns:
+            progreso(texto="Indexando prestaciones...")
+            datos["prestaciones"], datos["indice"] = indexar_prestaciones(df)
+            datos["indice_busqueda"] = IndiceBusqueda(datos["prestaciones"])
+        progreso(texto="Calculando resumen...")
+        datos["resumen"] = calcular_resumen(df)
+        return datos
+
+    def _datos_cargados(self, datos, nombre, etiqueta):
+        self.df = datos["df"]
+        self.archivo_seleccionado = nombre
+        self.cliente = None
+        self._archivo_streaming = None
+        self.total_registros = len(self.df)
+        self.stat_mem_var.set(formatear_bytes(datos["memoria"]))
+        self.resumen = datos["resumen"]
+        
+        if "Prestación" in self.df.columns:
+            self.prestaciones = datos["prestaciones"]
+            self.indice_prestaciones = datos["indice"]
+            self.motor_filtros = MotorFiltros(self.df, self.indice_prestaciones)
+            self.criterios_extra = [c for c in self.criterios_extra if c[0] in self.df.columns]
+            self._actualizar_boton_filtros()
+            self._indice_busqueda = datos["indice_busqueda"]
+            self.combo_prestacion.configure(values=self.prestaciones[:MAX_SUGERENCIAS])
+            self.combo_prestacion.set("")
+            if self.perfil_columnas:
+                etiqueta += f"\nPerfil de columnas activo ({len(self.perfil_columnas)} columnas)"
+            self.lbl_current_file.configure(text=etiqueta)
             
-            if "Prestación" in self.df.columns:
-                self.prestaciones = sorted(self.df["Prestación"].unique().astype(str))
-                self.combo_prestacion.configure(values=self.prestaciones)
-                self.combo_prestacion.set("")
-                self.lbl_current_file.configure(text=f"Cargado: {self.archivo_seleccionado}")
-                
-                # Actualizar estadísticas iniciales
-                self.stat_total_var.set(f"{len(self.df):,}")
-                self.stat_filtro_var.set("0")
-                self.stat_perc_var.set("0%")
-                
-                self.btn_save.configure(state="normal")
-            else:
-                 messagebox.showerror("Error", "Columna 'Prestación' no encontrada.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+            # Actualizar estadísticas iniciales
+            self.stat_total_var.set(f"{len(self.df):,}")
+            self.stat_filtro_var.set("0")
+            self.stat_perc_var.set("0%")
+            
+            self.btn_save.configure(state="normal")
+        else:
+             messagebox.showerror("Error", "Columna 'Prestación' no encontrada.")
+
+    def conectar_servidor(self):
+        url_previa = cargar_config().get("servidor_url") or f"http://127.0.0.1:{SERVIDOR_PUERTO}"
+        dialogo = ctk.CTkInputDialog(
+            title="Conectar a Servidor",
+            text=f"Dirección del servidor de consultas\n(vacío = {url_previa})"
+        )
+        url = dialogo.get_input()
+        if url is None: return
+        url = url.strip() or url_previa
+        if "://" not in url: url = "http://" + url
+
+        # Fuera de este equipo el servidor exige su token de acceso
+        token = None
+        if urllib.parse.urlparse(url).hostname not in HOSTS_LOCALES:
+            token_previo = cargar_config().get("servidor_token") or ""
+            dialogo = ctk.CTkInputDialog(
+                title="Conectar a Servidor",
+                text="Token de acceso del servidor" + ("\n(vacío = el guardado)" if token_previo else "")
+            )
+            token = dialogo.get_input()
+            if token is None: return
+            token = token.strip() or token_previo
+
+        cliente = ClienteConsultas(url, token)
+
+        def tarea(progreso, cancelado):
+            progreso(texto=f"Conectando a {url}...")
+            info = cliente.estado()
+            prestaciones = cliente.prestaciones()
+            resumen = {nombre: cliente.resumen(nombre) for nombre in info.get("resumenes", [])}
+            return info, prestaciones, resumen
+
+        def listo(resultado):
+            info, prestaciones, resumen = resultado
+            self.cliente = cliente
+            self._archivo_streaming = None
+            self.df = None
+            self.motor_filtros = None
+            self.resultado_filtrado = None
+            self._limpiar_vista()
+            self.archivo_seleccionado = info["origen"]
+            self._columnas_remotas = info["columnas"]
+            self.criterios_extra = [c for c in self.criterios_extra if c[0] in self._columnas_remotas]
+            self._actualizar_boton_filtros()
+            self.prestaciones = prestaciones
+            self.indice_prestaciones = {}
+            self._indice_busqueda = IndiceBusqueda(prestaciones)
+            self.resumen = resumen
+            self.combo_prestacion.configure(values=self.prestaciones[:MAX_SUGERENCIAS])
+            self.combo_prestacion.set("")
+            self.lbl_current_file.configure(text=f"Servidor: {url}\n{info['origen']}")
+
+            self.total_registros = info["filas"]
+            self.stat_total_var.set(f"{self.total_registros:,}")
+            self.stat_filtro_var.set("0")
+            self.stat_perc_var.set("0%")
+            self.stat_mem_var.set("remota")
+            self.btn_save.configure(state="normal")
+
+            try:
+                config = cargar_config()
+                config["servidor_url"] = url
+                if token: config["servidor_token"] = token
+                guardar_config(config)
+            except Exception:
+                pass
+
+        self.ejecutar_en_segundo_plano("Conectando a servidor", tarea, listo)
+
+    def extraer_directo(self, archivo_path=None):
+        """Filtra la prestación elegida recorriendo el Excel fila a fila, sin cargarlo entero"""
+        # Sin strip: la prestación elegida se compara tal cual (p. ej. "Limpieza ")
+        prestacion = self.combo_prestacion.get() or self.txt_search.get().strip()
+        if not prestacion:
+            messagebox.showinfo("Extracción Directa", "Escriba o elija primero la prestación a extraer.")
+            return
+
+        if archivo_path is None:
+            archivo_path = filedialog.askopenfilename(
+                title="Seleccionar archivo Excel",
+                filetypes=[("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*")],
+                initialdir=get_library_path(),
+            )
+            if not archivo_path: return
+
+        nombre = os.path.basename(archivo_path)
+        columnas = list(self.perfil_columnas)
+        criterios = list(self.criterios_extra)
+
+        def tarea(progreso, cancelado):
+            progreso(0.0, f"Recorriendo {nombre}...")
+            with self._medir("extraccion_directa", archivo=nombre, prestacion=prestacion, criterios=len(criterios)) as medicion:
+                resultado = extraer_prestaciones_streaming(archivo_path, [prestacion], progreso, cancelado, columnas, criterios)
+                if resultado is None: return None
+                df, prestaciones, leidas = resultado
+                medicion.filas = leidas
+            return df, prestaciones, IndiceBusqueda(prestaciones), leidas
+
+        def listo(resultado):
+            if resultado is None: return
+            df, prestaciones, indice_busqueda, leidas = resultado
+
+            # Solo existe el resultado; la hoja completa nunca se cargó
+            self.df = None
+            self.motor_filtros = None
+            self.cliente = None
+            self.resumen = {}
+            self._archivo_streaming = archivo_path
+            self._columnas_streaming = list(df.columns)
+            self.archivo_seleccionado = nombre
+            self.prestaciones = prestaciones
+            self.indice_prestaciones = {}
+            self._indice_busqueda = indice_busqueda
+            self.combo_prestacion.configure(values=self.prestaciones[:MAX_SUGERENCIAS])
+            self.combo_prestacion.set(prestacion)
+            self.lbl_current_file.configure(text=f"Extracción directa: {nombre}\n{len(df):,} de {leidas:,} filas")
+
+            self.total_registros = leidas
+            self.stat_total_var.set(f"{leidas:,}")
+            self.stat_mem_var.set(formatear_bytes(df.memory_usage(deep=True).sum()))
+            self.btn_save.configure(state="normal")
+
+            self.resultado_filtrado = df
+            self.mostrar_resultados()
+
+        self.ejecutar_en_segundo_plano("Extracción directa", tarea, listo)
+
+    def _columnas_disponibles(self):
+        if self.cliente is not None:
+            return list(self._columnas_remotas)
+        if self.df is None and self._archivo_streaming is not None:
+            return list(self._columnas_streaming)
+        return list(self.df.columns) if self.df is not None else []
 
     def filtrar_prestaciones_evento(self, event):
-        texto = self.txt_search.get().lower()
+        # Debounce: solo se busca cuando el usuario deja de teclear por DEBOUNCE_MS
+        if self._busqueda_pendiente is not None:
+            self.root.after_cancel(self._busqueda_pendiente)
+        self._busqueda_pendiente = self.root.after(DEBOUNCE_MS, self._aplicar_busqueda)
+
+    def _aplicar_busqueda(self):
+        self._busqueda_pendiente = None
+        if self._indice_busqueda is None: return
+
+        texto = self.txt_search.get()
         if not texto:
-            self.combo_prestacion.configure(values=self.prestaciones)
+            self.combo_prestacion.configure(values=self.prestaciones[:MAX_SUGERENCIAS])
         else:
-            values = [p for p in self.prestaciones if texto in p.lower()]
+            posiciones = self._indice_busqueda.buscar(texto)
+            values = [self.prestaciones[i] for i in posiciones[:MAX_SUGERENCIAS]]
             self.combo_prestacion.configure(values=values)
             if len(values) > 0:
                 self.combo_prestacion.set(values[0])
 
     def buscar_prestacion(self):
         prestacion = self.combo_prestacion.get()
-        if not prestacion or self.df is None: return
+        if not prestacion and not self.criterios_extra: return
 
-        filtro = self.df["Prestación"].astype(str) == prestacion
-        self.resultado_filtrado = self.df[filtro]
-        
-        self.mostrar_resultados()
+        if self.cliente is not None:
+            cliente = self.cliente
+            extra = list(self.criterios_extra)
+
+            def tarea_remota(progreso, cancelado):
+                # Solo la primera página: el resto se pide a medida que la grilla se desplaza
+                with self._medir("buscar_prestacion", prestacion=prestacion, servidor=cliente.url) as medicion:
+                    resultado = ResultadoRemoto.abrir(cliente, prestacion, extra)
+                    medicion.filas = len(resultado)
+                return resultado
+
+            def listo_remoto(resultado):
+                if resultado is None: return
+                self.resultado_filtrado = resultado
+                self.mostrar_resultados()
+
+            self.ejecutar_en_segundo_plano("Consultando servidor", tarea_remota, listo_remoto)
+            return
+
+        if self.df is None and self._archivo_streaming is not None:
+            # Sin la hoja completa en memoria: otra pasada en streaming sobre el mismo archivo
+            self.extraer_directo(self._archivo_streaming)
+            return
+
+        if self.df is None or self.motor_filtros is None: return
+
+        criterios = list(self.criterios_extra)
+        if prestacion:
+            criterios.append(("Prestación", "=", prestacion))
+        motor = self.motor_filtros
+
+        def tarea(progreso, cancelado):
+            with self._medir("buscar_prestacion", prestacion=prestacion, criterios=len(criterios)) as medicion:
+                resultado = motor.resultado(criterios)
+                medicion.filas = len(resultado)
+            return resultado
+
+        def listo(resultado):
+            self.resultado_filtrado = resultado
+            self.mostrar_resultados()
+
+        self.ejecutar_en_segundo_plano("Aplicando filtro", tarea, listo)
         
     def mostrar_resultados(self):
-        # Clear
-        for item in self.tree.get_children(): self.tree.delete(item)
-        
-        if self.resultado_filtrado is None: return
+        if self.resultado_filtrado is None:
+            self._limpiar_vista()
+            return
 
-        # Columns
-        if self.columnas_seleccionadas:
-            cols = [c for c in self.columnas_seleccionadas if c in self.resultado_filtrado.columns]
-            df_show = self.resultado_filtrado[cols].copy()
-        else:
-            cols = list(self.resultado_filtrado.columns)
-            df_show = self.resultado_filtrado.copy()
+        with self._medir("mostrar_resultados") as medicion:
+            # Columns (sin copiar: la grilla lee por posición desde el resultado)
+            if self.columnas_seleccionadas:
+                cols = [c for c in self.columnas_seleccionadas if c in self.resultado_filtrado.columns]
+            else:
+                cols = list(self.resultado_filtrado.columns)
+
+            # Las permutaciones de orden valen mientras no cambie el conjunto de resultados
+            if self._vista_df is not self.resultado_filtrado:
+                self._ordenes_cache = {}
+                self._orden_actual = None
+                self._vista_orden = None
 
-        self.tree["columns"] = cols
-        for col in cols:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
+            self._vista_df = self.resultado_filtrado
+            self._vista_columnas = [self.resultado_filtrado.columns.get_loc(c) for c in cols]
 
-        for idx, row in df_show.iterrows():
-            valores = [str(val) for val in row.values]
-            self.tree.insert("", "end", values=valores)
+            self.tree["columns"] = cols
+            for col, pos in zip(cols, self._vista_columnas):
+                self.tree.heading(col, text=col, command=lambda p=pos: self.ordenar_por(p))
+                self.tree.column(col, width=100)
+            self._actualizar_encabezados_orden()
+
+            self._vista_offset = 0
+            self.tree.selection_remove(self.tree.selection())
+            self._render_vista()
+            medicion.filas = len(self.resultado_filtrado)
+        self._mostrar_medicion()
             
         # Actualizar Estadísticas
-        total = len(self.df) if self.df is not None else 0
-        filtrados = len(df_show)
+        total = self.total_registros
+        filtrados = len(self.resultado_filtrado)
         porcentaje = (filtrados / total * 100) if total > 0 else 0
         
         self.stat_filtro_var.set(f"{filtrados:,}")
         self.stat_perc_var.set(f"{porcentaje:.1f}%")
 
+    # --- GRILLA VIRTUAL ---
+
+    def _render_vista(self):
+        """Rellena los items del Treeview con la ventana visible del resultado"""
+        total = len(self._vista_df) if self._vista_df is not None else 0
+        max_offset = max(0, total - self._vista_filas_visibles)
+        self._vista_offset = max(0, min(self._vista_offset, max_offset))
+        fin = min(total, self._vista_offset + self._vista_filas_visibles + VIRTUAL_BUFFER_ROWS)
+        if isinstance(self._vista_df, ResultadoRemoto):
+            filas = self._vista_df.filas(self._vista_offset, fin, self._vista_columnas) if total else []
+            if filas is None:
+                # Página aún no descargada: marcadores hasta que llegue
+                self._pedir_paginas(self._vista_df, self._vista_offset, fin)
+                filas = [["…"] * len(self._vista_columnas)] * (fin - self._vista_offset)
+        else:
+            posiciones = slice(self._vista_offset, fin)
+            if self._vista_orden is not None:
+                posiciones = self._vista_orden[posiciones]
+            filas = formatear_filas(self._vista_df, posiciones, self._vista_columnas) if total else []
+
+        # Reutilizar los items existentes; solo se crean o borran los que sobran/faltan
+        while len(self._vista_items) < len(filas):
+            self._vista_items.append(self.tree.insert("", "end"))
+        while len(self._vista_items) > len(filas):
+            self.tree.delete(self._vista_items.pop())
+        for iid, valores in zip(self._vista_items, filas):
+            self.tree.item(iid, values=valores)
+        self.tree.yview_moveto(0)
+
+        if total:
+            fin_visible = min(total, self._vista_offset + self._vista_filas_visibles)
+            self.tree_scroll_y.set(self._vista_offset / total, fin_visible / total)
+        else:
+            self.tree_scroll_y.set(0.0, 1.0)
+
+    def _pedir_paginas(self, remoto, desde, hasta):
+        """Descarga en segundo plano las páginas que faltan; al llegar se vuelve a dibujar"""
+        if self._hilo_paginas is not None: return  # Al terminar la descarga actual se vuelve a pedir
+        estado = {"error": None}
+
+        def worker():
+            try:
+                remoto.cargar(desde, hasta)
+            except Exception as e:
+                estado["error"] = str(e)
+
+        self._hilo_paginas = threading.Thread(target=worker, daemon=True)
+        self._hilo_paginas.start()
+        self.root.after(POLL_MS, self._revisar_paginas, estado)
+
+    def _revisar_paginas(self, estado):
+        if self._hilo_paginas.is_alive():
+            self.root.after(POLL_MS, self._revisar_paginas, estado)
+            return
+        self._hilo_paginas = None
+        if estado["error"] is not None:
+            self.lbl_rendimiento.configure(text=f"Error al consultar el servidor: {estado['error']}")
+        elif isinstance(self._vista_df, ResultadoRemoto):
+            # Vuelve a dibujar (y pide lo que falte si la vista cambió mientras tanto)
+            self._render_vista()
+
+    def _limpiar_vista(self):
+        for item in self.tree.get_children(): self.tree.delete(item)
+        self._vista_items = []
+        self._vista_df = None
+        self._vista_columnas = None
+        self._vista_offset = 0
+        self._vista_orden = None
+        self._ordenes_cache = {}
+        self._orden_actual = None
+        self.tree_scroll_y.set(0.0, 1.0)
+
+    def ordenar_por(self, pos):
+        """Clic en un encabezado: ascendente, y el segundo clic invierte el orden"""
+        if self._vista_df is None: return
+        descendente = self._orden_actual == (pos, False)
+
+        if isinstance(self._vista_df, ResultadoRemoto):
+            # Lo ordena el servidor; las páginas se piden de nuevo en el orden nuevo
+            self._vista_df = self.resultado_filtrado = self._vista_df.ordenado(pos, descendente)
+            self._orden_actual = (pos, descendente)
+            self.tree.selection_remove(self.tree.selection())
+            self._actualizar_encabezados_orden()
+            self._vista_offset = 0
+            self._render_vista()
+            return
+
+        # No basta con invertir la ascendente: subiría los vacíos y daría vuelta los empates
+        orden = self._ordenes_cache.get((pos, descendente))
+        if orden is None:
+            with self._medir("ordenar", columna=str(self._vista_df.columns[pos]), descendente=descendente) as medicion:
+                orden = orden_columna(self._vista_df.iloc[:, pos], descendente)
+                medicion.filas = len(orden)
+            self._mostrar_medicion()
+            self._ordenes_cache[(pos, descendente)] = orden
+
+        self._vista_orden = orden
+        self._orden_actual = (pos, descendente)
+        self.tree.selection_remove(self.tree.selection())  # Los items reutilizados mostrarán otras filas
+        self._actualizar_encabezados_orden()
+        self._vista_offset = 0
+        self._render_vista()
+
+    def _actualizar_encabezados_orden(self):
+        for col, pos in zip(self.tree["columns"], self._vista_columnas or []):
+            texto = str(col)
+            if self._orden_actual is not None and self._orden_actual[0] == pos:
+                texto += " ▼" if self._orden_actual[1] else " ▲"
+            self.tree.heading(col, text=texto)
+
+    def _scroll_vista(self, accion, *args):
+        """Comando de la barra vertical: mueve la ventana sobre el DataFrame"""
+        if self._vista_df is None: return
+        anterior = self._vista_offset
+        if accion == "moveto":
+            self._vista_offset = int(float(args[0]) * len(self._vista_df))
+        elif accion == "scroll":
+            paso = int(args[0])
+            if len(args) > 1 and args[1] == "pages":
+                paso *= self._vista_filas_visibles
+            self._vista_offset += paso
+
+        if self._vista_offset != anterior:
+            self.tree.selection_remove(self.tree.selection())
+            self._render_vista()
+
+    def _on_tree_mousewheel(self, event):
+        if sys.platform.startswith("win"):
+            delta = -int(event.delta / 40)
+        elif sys.platform == "darwin":
+            delta = -event.delta
+        else:
+            delta = -3 if event.num == 4 else 3
+        self._scroll_vista("scroll", delta, "units")
+        return "break"  # Evita que el Treeview desplace su propio contenido
+
+    def _on_tree_configure(self, event):
+        filas = max(1, (event.height - TREE_HEADING_HEIGHT) // TREE_ROW_HEIGHT)
+        if filas != self._vista_filas_visibles:
+            self._vista_filas_visibles = filas
+            if self._vista_df is not None:
+                self._render_vista()
+
     def limpiar_resultados(self):
         self.resultado_filtrado = None
-        for item in self.tree.get_children(): self.tree.delete(item)
+        self._limpiar_vista()
         self.combo_prestacion.set("")
         self.txt_search.delete(0, 'end')
+        self.criterios_extra = []
+        self._actualizar_boton_filtros()
         
         # Reset stats
         self.stat_filtro_var.set("0")
@@ -427,27 +2218,121 @@ class FiltradorMultiArchivosGUI:
                      self.guardar_df(self.df, "COMPLETO")
              return
 
-        self.guardar_df(self.resultado_filtrado, self.combo_prestacion.get())
+        self.guardar_df(self.resultado_filtrado, self.combo_prestacion.get() or "FILTRADO")
 
     def guardar_df(self, dataframe, suffix):
-         try:
-            archivo_base = os.path.splitext(self.archivo_seleccionado)[0]
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            clean_suffix = suffix.replace(' ', '_').replace('/', '_')
-            nombre = f"VS_{archivo_base}_{clean_suffix}_{timestamp}.xlsx"
-            
-            docs = os.path.join(os.path.expanduser("~"), "Documents")
-            out_dir = os.path.join(docs, "Vidasalud_Export")
-            if not os.path.exists(out_dir): os.makedirs(out_dir)
-            
-            path = os.path.join(out_dir, nombre)
-            dataframe.to_excel(path, index=False)
-            messagebox.showinfo("Guardado", f"Archivo guardado en:\n{path}")
-         except Exception as e:
-             messagebox.showerror("Error", str(e))
+        try:
+            formato = self.export_format_var.get()
+            nombre = nombre_exportacion(self.archivo_seleccionado, suffix, formato)
+            path = ruta_unica(os.path.join(get_export_path(), nombre))
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        def tarea(progreso, cancelado):
+            datos = dataframe
+            if isinstance(datos, ResultadoRemoto):
+                # Exportar sí necesita todas las filas (con sus tipos)
+                progreso(0.0, f"Descargando {len(datos):,} filas del servidor...")
+                datos = datos.descargar(progreso, cancelado)
+                if datos is None: return None
+            progreso(0.0, f"Exportando {len(datos):,} filas...")
+            with self._medir("guardar_df", formato=formato) as medicion:
+                medicion.filas = len(datos)
+                return exportar_dataframe(datos, path, formato, progreso, cancelado)
+
+        def listo(filas_por_segundo):
+            if filas_por_segundo is None: return
+            hojas = -(-len(dataframe) // (EXCEL_MAX_FILAS - 1)) if formato == "xlsx" else 1
+            aviso = f"\n\nExcel admite {EXCEL_MAX_FILAS:,} filas por hoja: se repartió en {hojas} hojas." if hojas > 1 else ""
+            messagebox.showinfo(
+                "Guardado",
+                f"Archivo guardado en:\n{path}\n\n{len(dataframe):,} filas ({filas_por_segundo:,.0f} filas/s){aviso}"
+            )
+
+        self.ejecutar_en_segundo_plano("Guardando resultados", tarea, listo)
+
+    # --- TAREAS EN SEGUNDO PLANO ---
+
+    def ejecutar_en_segundo_plano(self, descripcion, tarea, al_terminar):
+        """Corre tarea(progreso, cancelado) en un hilo; al_terminar(resultado) se ejecuta en el hilo de Tk"""
+        if self._tarea is not None: return False
+
+        cola = queue.Queue()
+        cancelado = threading.Event()
+
+        def progreso(fraccion=None, texto=None):
+            cola.put(("progreso", fraccion, texto))
+
+        def worker():
+            try:
+                cola.put(("ok", tarea(progreso, cancelado), None))
+            except Exception as e:
+                cola.put(("error", e, None))
+
+        trabajo = {"cola": cola, "cancelado": cancelado, "al_terminar": al_terminar}
+        self._tarea = trabajo
+        self._bloquear_controles(True, descripcion)
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(POLL_MS, self._revisar_tarea, trabajo)
+        return True
+
+    def _revisar_tarea(self, trabajo):
+        if trabajo is not self._tarea: return  # Cancelada: el resultado se descarta
+
+        try:
+            while True:
+                tipo, valor, texto = trabajo["cola"].get_nowait()
+                if tipo == "progreso":
+                    self._mostrar_progreso(valor, texto)
+                    continue
+
+                self._tarea = None
+                self._bloquear_controles(False)
+                self._mostrar_medicion()
+                if tipo == "error":
+                    messagebox.showerror("Error", str(valor))
+                else:
+                    trabajo["al_terminar"](valor)
+                return
+        except queue.Empty:
+            pass
+        self.root.after(POLL_MS, self._revisar_tarea, trabajo)
+
+    def cancelar_tarea(self):
+        if self._tarea is None: return
+        self._tarea["cancelado"].set()
+        self._tarea = None
+        self._bloquear_controles(False)
+
+    def _mostrar_progreso(self, fraccion, texto):
+        if texto is not None:
+            self.lbl_task.configure(text=texto)
+        if fraccion is not None:
+            if self.progress_task.cget("mode") != "determinate":
+                self.progress_task.stop()
+                self.progress_task.configure(mode="determinate")
+            self.progress_task.set(max(0.0, min(1.0, fraccion)))
+
+    def _bloquear_controles(self, ocupado, descripcion=""):
+        """Deshabilita las acciones mientras hay una tarea en curso (el scroll sigue activo)"""
+        botones = [self.btn_load, self.btn_load_library, self.btn_connect, self.btn_stream_extract, self.btn_apply_filter, self.btn_advanced_filter, self.btn_summary, self.btn_clear, self.btn_save, self.btn_columns]
+        if ocupado:
+            self._estados_previos = {b: b.cget("state") for b in botones}
+            for b in botones: b.configure(state="disabled")
+            self.lbl_task.configure(text=descripcion)
+            self.progress_task.configure(mode="indeterminate")
+            self.progress_task.start()
+            self.task_frame.pack(fill="x", padx=20, pady=(0, 10), after=self.lbl_rendimiento)
+        else:
+            self.progress_task.stop()
+            self.task_frame.pack_forget()
+            for b, estado in self._estados_previos.items(): b.configure(state=estado)
+            self._estados_previos = {}
 
     def configurar_columnas(self):
-        if self.df is None: return
+        columnas = self._columnas_disponibles()
+        if not columnas: return
         
         # Simple pop-up window using CTk
         pop = ctk.CTkToplevel(self.root)
@@ -461,24 +2346,661 @@ class FiltradorMultiArchivosGUI:
         scroll.pack(fill="both", expand=True, padx=10, pady=10)
         
         self.check_vars = {}
-        for col in self.df.columns:
+        for col in columnas:
             var = ctk.BooleanVar(value=(col in self.columnas_seleccionadas or not self.columnas_seleccionadas))
             self.check_vars[col] = var
             chk = ctk.CTkCheckBox(scroll, text=col, variable=var)
             chk.pack(anchor="w", pady=2)
+
+        # Perfil: al cargar solo se leen las columnas marcadas (más "Prestación")
+        perfil_var = ctk.BooleanVar(value=bool(self.perfil_columnas))
+        ctk.CTkCheckBox(pop, text="Leer solo estas columnas al cargar archivos", variable=perfil_var).pack(anchor="w", padx=15)
             
         def apply():
             self.columnas_seleccionadas = [col for col, var in self.check_vars.items() if var.get()]
+            self.perfil_columnas = list(self.columnas_seleccionadas) if perfil_var.get() else []
+            try:
+                config = cargar_config()
+                config["perfil_columnas"] = self.perfil_columnas
+                guardar_config(config)
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
             if self.resultado_filtrado is not None:
                 self.mostrar_resultados()
             pop.destroy()
             
         ctk.CTkButton(pop, text="Aplicar Cambios", command=apply).pack(pady=10)
 
+    def mostrar_resumen(self):
+        if not self.resumen:
+            if self.df is not None:
+                messagebox.showinfo("Resumen", "No hay columnas para resumir en este archivo.")
+            return
+
+        pop = ctk.CTkToplevel(self.root)
+        pop.title("Resumen")
+        pop.geometry("760x520")
+
+        nombres = list(self.resumen)
+        seleccion = tk.StringVar(value=nombres[0])
+
+        barra = ctk.CTkFrame(pop, fg_color="transparent")
+        barra.pack(fill="x", padx=10, pady=10)
+        ctk.CTkSegmentedButton(barra, values=nombres, variable=seleccion,
+                               command=lambda _: mostrar()).pack(side="left")
+
+        def exportar():
+            nombre = seleccion.get()
+            self.guardar_df(self.resumen[nombre], "RESUMEN_" + nombre.replace("Por ", ""))
+
+        ctk.CTkButton(barra, text="💾 Exportar", width=120, command=exportar).pack(side="right")
+
+        marco = ctk.CTkFrame(pop, fg_color="transparent")
+        marco.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        scroll_y = ctk.CTkScrollbar(marco)
+        scroll_y.pack(side="right", fill="y")
+        tabla = ttk.Treeview(marco, show="headings", yscrollcommand=scroll_y.set)
+        tabla.pack(fill="both", expand=True)
+        scroll_y.configure(command=tabla.yview)
+
+        def mostrar():
+            df = self.resumen[seleccion.get()]
+            tabla.delete(*tabla.get_children())
+            cols = [str(c) for c in df.columns]
+            tabla["columns"] = cols
+            for col in cols:
+                tabla.heading(col, text=col)
+                tabla.column(col, width=140 if col == cols[0] else 100, anchor="w" if col == cols[0] else "e")
+            for fila in df.itertuples(index=False, name=None):
+                tabla.insert("", "end", values=[f"{v:,}" if isinstance(v, (int, np.integer)) else str(v) for v in fila])
+
+        mostrar()
+
+    def _actualizar_boton_filtros(self):
+        texto = "🧩 Filtros Avanzados"
+        if self.criterios_extra:
+            texto += f" ({len(self.criterios_extra)})"
+        self.btn_advanced_filter.configure(text=texto)
+
+    def configurar_filtros(self):
+        disponibles = self._columnas_disponibles()
+        if not disponibles: return
+
+        pop = ctk.CTkToplevel(self.root)
+        pop.title("Filtros Avanzados")
+        pop.geometry("640x480")
+
+        ctk.CTkLabel(pop, text="Criterios (se combinan con Y)", font=ctk.CTkFont(weight="bold")).pack(pady=(10, 0))
+        ctk.CTkLabel(
+            pop,
+            text="en lista: valores separados por coma · entre: desde;hasta (uno puede ir vacío) · fechas dd/mm/aaaa",
+            font=ctk.CTkFont(size=11),
+            text_color=self.colors["text_sec"]
+        ).pack(pady=(0, 5))
+
+        scroll = ctk.CTkScrollableFrame(pop)
+        scroll.pack(fill="both", expand=True, padx=10, pady=5)
+
+        columnas = [str(c) for c in disponibles]
+        por_nombre = {str(c): c for c in disponibles}
+        filas = []
+
+        def agregar(col=None, op="=", valor=""):
+            f = ctk.CTkFrame(scroll, fg_color="transparent")
+            f.pack(fill="x", pady=2)
+            col_var = tk.StringVar(value=str(col) if col is not None else columnas[0])
+            op_var = tk.StringVar(value=op)
+            ctk.CTkOptionMenu(f, values=columnas, variable=col_var, width=180).pack(side="left", padx=2)
+            ctk.CTkOptionMenu(f, values=OPERADORES_FILTRO, variable=op_var, width=110).pack(side="left", padx=2)
+            entry = ctk.CTkEntry(f)
+            entry.pack(side="left", fill="x", expand=True, padx=2)
+            if isinstance(valor, (list, tuple)):
+                valor = (";" if op == "entre" else ", ").join(valor)
+            entry.insert(0, valor)
+            fila = (f, col_var, op_var, entry)
+
+            def quitar():
+                filas.remove(fila)
+                f.destroy()
+
+            ctk.CTkButton(f, text="✖", width=30, command=quitar, fg_color="transparent",
+                          text_color=self.colors["danger"]).pack(side="left", padx=2)
+            filas.append(fila)
+
+        for col, op, valor in self.criterios_extra:
+            agregar(col, op, valor)
+        if not filas:
+            agregar()
+
+        def apply():
+            criterios = []
+            for _, col_var, op_var, entry in filas:
+                texto = entry.get().strip()
+                op = op_var.get()
+                valor = parsear_valor_criterio(op, texto)
+                if not texto or valor in ([], ("", "")): continue
+                criterios.append((por_nombre[col_var.get()], op, valor))
+
+            try:
+                normalizar_criterios(criterios)
+            except Exception as e:
+                messagebox.showerror("Error", str(e), parent=pop)
+                return
+
+            self.criterios_extra = criterios
+            self._actualizar_boton_filtros()
+            pop.destroy()
+            if self.criterios_extra or self.combo_prestacion.get():
+                self.buscar_prestacion()
+
+        botones = ctk.CTkFrame(pop, fg_color="transparent")
+        botones.pack(pady=10)
+        ctk.CTkButton(botones, text="+ Agregar criterio", command=agregar, fg_color="transparent",
+                      border_width=1, text_color=("gray10", "gray90")).pack(side="left", padx=5)
+        ctk.CTkButton(botones, text="Aplicar Filtros", command=apply).pack(side="left", padx=5)
+
+# --- SERVIDOR DE CONSULTAS ---
+# Un solo proceso mantiene los datos cargados e indexados y responde por HTTP (JSON):
+#   GET /estado                          origen, filas y columnas
+#   GET /prestaciones                    lista de prestaciones
+#   GET /consulta?prestacion=X&f=col|op|valor&orden=col&desc=1&pagina=0&tamano=500
+#   GET /resumen?tabla=Por mes
+# Las filas viajan con tipo (números, fechas ISO, null para vacíos) y el cliente solo
+# pide las páginas que muestra la grilla. Fuera de 127.0.0.1 se exige un token
+# (Authorization: Bearer ...) y se puede cifrar con --certificado/--clave.
+# Los datos son una instantánea inmutable: las lecturas concurrentes no usan un lock global.
+SERVIDOR_PUERTO = 8765
+PAGINA_TAMANO = 500
+PAGINA_MAX = 5000
+PAGINAS_CACHE_MAX = 20
+HOSTS_LOCALES = ("127.0.0.1", "localhost", "::1")
+
+
+def tipo_columna(serie):
+    """"fecha", "numero" o "texto": cómo viaja la columna en el JSON"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "fecha"
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return "numero"
+    return "texto"
+
+
+def tabla_json(df, posiciones):
+    """Filas indicadas como {"columnas", "tipos", "filas"} con valores JSON nativos"""
+    bloque = df.iloc[posiciones]
+    tipos = [tipo_columna(bloque.iloc[:, i]) for i in range(bloque.shape[1])]
+    valores = []
+    for i, tipo in enumerate(tipos):
+        serie = bloque.iloc[:, i]
+        if tipo == "fecha":
+            lista = [v.isoformat() if not pd.isna(v) else None for v in serie]
+        else:
+            lista = serie.astype(object).tolist() if tipo == "numero" else serie.astype(str).tolist()
+            lista = [None if vacio else v for v, vacio in zip(lista, serie.isna().to_numpy())]
+        valores.append(lista)
+    return {"columnas": [str(c) for c in df.columns], "tipos": tipos,
+            "filas": [list(fila) for fila in zip(*valores)]}
+
+
+def tabla_desde_json(datos):
+    """DataFrame con los tipos originales a partir de tabla_json"""
+    df = pd.DataFrame(datos["filas"], columns=datos["columnas"])
+    for col, tipo in zip(datos["columnas"], datos.get("tipos", [])):
+        if tipo == "fecha":
+            df[col] = pd.to_datetime(df[col])
+        elif tipo == "numero":
+            df[col] = pd.to_numeric(df[col])
+        else:
+            df[col] = df[col].astype(object).where(df[col].notna(), np.nan)  # Vacíos como en local
+    return df
+
+
+class EstadoConsultas:
+    """Instantánea de solo lectura de los datos que sirve el servidor"""
+
+    def __init__(self, df, origen):
+        self.df = df
+        self.origen = origen
+        self.columnas = {str(c): c for c in df.columns}
+        self.prestaciones, indice = indexar_prestaciones(df) if "Prestación" in df.columns else ([], {})
+        self.motor = MotorFiltros(df, indice)
+        self.resumen = calcular_resumen(df)
+        self._ordenes = OrderedDict()  # (criterios, columna, descendente) -> posiciones ordenadas
+        self._ordenes_lock = threading.Lock()
+
+    def info(self):
+        return {"origen": self.origen, "filas": len(self.df), "columnas": list(self.columnas),
+                "resumenes": list(self.resumen)}
+
+    def consulta(self, params):
+        criterios = []
+        for f in params.get("f", []):
+            col, op, texto = f.split("|", 2)
+            criterios.append((self.columnas[col], op, parsear_valor_criterio(op, texto)))
+        prestacion = params.get("prestacion", [""])[0]
+        if prestacion:
+            criterios.append(("Prestación", "=", prestacion))
+
+        pagina = max(0, int(params.get("pagina", ["0"])[0]))
+        tamano = max(1, min(PAGINA_MAX, int(params.get("tamano", [str(PAGINA_TAMANO)])[0])))
+        posiciones = self.motor.posiciones(criterios)
+        orden = params.get("orden", [""])[0]
+        if orden:
+            posiciones = self._ordenar(criterios, posiciones, self.columnas[orden], params.get("desc", ["0"])[0] == "1")
+        trozo = posiciones[pagina * tamano:(pagina + 1) * tamano]
+        return {"total": len(posiciones), "pagina": pagina, "tamano": tamano, **tabla_json(self.df, trozo)}
+
+    def _ordenar(self, criterios, posiciones, columna, descendente):
+        """Posiciones del resultado en el orden pedido (las últimas se recuerdan, como en MotorFiltros)"""
+        clave = (normalizar_criterios(criterios), columna, descendente)
+        with self._ordenes_lock:
+            if clave in self._ordenes:
+                self._ordenes.move_to_end(clave)
+                return self._ordenes[clave]
+
+        ordenadas = posiciones[orden_columna(self.df[columna].take(posiciones), descendente)]
+        with self._ordenes_lock:
+            self._ordenes[clave] = ordenadas
+            if len(self._ordenes) > FILTRO_CACHE_MAX:
+                self._ordenes.popitem(last=False)
+        return ordenadas
+
+    def tabla_resumen(self, params):
+        tabla = self.resumen[params.get("tabla", [""])[0]]
+        return tabla_json(tabla, slice(None))
+
+
+class _ManejadorConsultas(BaseHTTPRequestHandler):
+    server_version = "VidasaludConsultas/1.0"
+
+    def do_GET(self):
+        if not self._autorizado():
+            return self._responder(401, {"error": "Token de acceso inválido o ausente."})
+
+        url = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        estado = self.server.estado  # Una sola lectura: la instantánea no cambia durante la petición
+        try:
+            if url.path == "/estado":
+                datos = estado.info()
+            elif url.path == "/prestaciones":
+                datos = {"prestaciones": estado.prestaciones}
+            elif url.path == "/consulta":
+                datos = estado.consulta(params)
+            elif url.path == "/resumen":
+                datos = estado.tabla_resumen(params)
+            else:
+                return self._responder(404, {"error": f"Ruta desconocida: {url.path}"})
+        except (KeyError, ValueError) as e:
+            return self._responder(400, {"error": f"Consulta inválida: {e}"})
+        except Exception as e:
+            return self._responder(500, {"error": str(e)})
+        self._responder(200, datos)
+
+    def _autorizado(self):
+        token = self.server.token
+        if not token:
+            return True
+        recibido = self.headers.get("Authorization", "").encode("utf-8")
+        return hmac.compare_digest(recibido, f"Bearer {token}".encode("utf-8"))
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class ServidorConsultas(ThreadingHTTPServer):
+    """Servidor HTTP con un hilo por petición sobre una EstadoConsultas"""
+    daemon_threads = True
+
+    def __init__(self, direccion, estado, token=None):
+        super().__init__(direccion, _ManejadorConsultas)
+        self.estado = estado
+        self.token = token
+
+
+class ClienteConsultas:
+    """Cliente liviano del servidor de consultas, usado por la interfaz"""
+
+    def __init__(self, url, token=None, timeout=60):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _get(self, ruta, **params):
+        consulta = urllib.parse.urlencode(params, doseq=True)
+        peticion = urllib.request.Request(f"{self.url}{ruta}?{consulta}")
+        if self.token:
+            peticion.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout) as respuesta:
+                return json.loads(respuesta.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            # El servidor explica el error en el cuerpo JSON
+            try:
+                mensaje = json.loads(e.read().decode("utf-8"))["error"]
+            except Exception:
+                mensaje = e.reason
+            raise Exception(f"Servidor ({e.code}): {mensaje}") from None
+        except urllib.error.URLError as e:
+            raise Exception(f"No se pudo conectar con {self.url}: {e.reason}") from None
+
+    def estado(self):
+        return self._get("/estado")
+
+    def prestaciones(self):
+        return self._get("/prestaciones")["prestaciones"]
+
+    def resumen(self, tabla):
+        return tabla_desde_json(self._get("/resumen", tabla=tabla))
+
+    def consulta(self, prestacion="", criterios=(), pagina=0, tamano=PAGINA_MAX, orden=None):
+        filtros = []
+        for col, op, valor in criterios:
+            if op == "en lista":
+                valor = ",".join(valor)
+            elif op == "entre":
+                valor = ";".join(valor)
+            filtros.append(f"{col}|{op}|{valor}")
+        params = {"prestacion": prestacion, "f": filtros, "pagina": pagina, "tamano": tamano}
+        if orden is not None:
+            params["orden"], params["desc"] = orden[0], int(orden[1])
+        return self._get("/consulta", **params)
+
+
+class ResultadoRemoto:
+    """Resultado de una consulta que vive en el servidor
+
+    La grilla pide solo las páginas que muestra (se recuerdan las últimas); el
+    resultado completo se descarga únicamente para exportarlo.
+    """
+
+    def __init__(self, cliente, prestacion, criterios, total, columnas, orden=None):
+        self.cliente = cliente
+        self.prestacion = prestacion
+        self.criterios = list(criterios)
+        self.total = total
+        self.columns = pd.Index(columnas)
+        self.orden = orden  # (columna, descendente) o None
+        self._paginas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def abrir(cls, cliente, prestacion="", criterios=()):
+        """Ejecuta la consulta y deja la primera página lista"""
+        datos = cliente.consulta(prestacion, criterios, 0, PAGINA_TAMANO)
+        remoto = cls(cliente, prestacion, criterios, datos["total"], datos["columnas"])
+        remoto._guardar(0, tabla_desde_json(datos))
+        return remoto
+
+    def __len__(self):
+        return self.total
+
+    def ordenado(self, pos, descendente):
+        """Misma consulta ordenada en el servidor por la columna pos"""
+        return ResultadoRemoto(self.cliente, self.prestacion, self.criterios, self.total, list(self.columns),
+                               (self.columns[pos], descendente))
+
+    def _rango_paginas(self, desde, hasta):
+        return range(desde // PAGINA_TAMANO, (max(desde, hasta - 1)) // PAGINA_TAMANO + 1)
+
+    def _guardar(self, numero, pagina):
+        with self._lock:
+            self._paginas[numero] = pagina
+            if len(self._paginas) > PAGINAS_CACHE_MAX:
+                self._paginas.popitem(last=False)
+
+    def cargar(self, desde, hasta):
+        """Trae del servidor las páginas que faltan para las filas [desde, hasta)"""
+        for numero in self._rango_paginas(desde, hasta):
+            with self._lock:
+                if numero in self._paginas: continue
+            datos = self.cliente.consulta(self.prestacion, self.criterios, numero, PAGINA_TAMANO, self.orden)
+            self._guardar(numero, tabla_desde_json(datos))
+
+    def filas(self, desde, hasta, columnas=None):
+        """Filas [desde, hasta) como texto para el Treeview, o None si falta alguna página"""
+        partes = []
+        with self._lock:
+            for numero in self._rango_paginas(desde, hasta):
+                pagina = self._paginas.get(numero)
+                if pagina is None:
+                    return None
+                self._paginas.move_to_end(numero)
+                inicio = numero * PAGINA_TAMANO
+                partes.append(pagina.iloc[max(0, desde - inicio):max(0, hasta - inicio)])
+        bloque = pd.concat(partes) if len(partes) > 1 else partes[0]
+        return formatear_filas(bloque, slice(None), columnas)
+
+    def descargar(self, progreso=None, cancelado=None):
+        """Resultado completo con sus tipos (para exportar), o None si se canceló"""
+        partes, recibidas, pagina = [], 0, 0
+        while recibidas < self.total:
+            if cancelado is not None and cancelado.is_set():
+                return None
+            datos = self.cliente.consulta(self.prestacion, self.criterios, pagina, PAGINA_MAX, self.orden)
+            if not datos["filas"]: break
+            partes.append(tabla_desde_json(datos))
+            recibidas += len(datos["filas"])
+            pagina += 1
+            if progreso is not None:
+                progreso(recibidas / self.total, f"{recibidas:,}/{self.total:,} filas recibidas")
+        if not partes:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(partes, ignore_index=True)
+
+
+def ejecutar_servidor(argv=None):
+    """Carga los datos una vez y los sirve en la red local (--servidor)"""
+    parser = argparse.ArgumentParser(
+        prog="vidasalud --servidor",
+        description="Servidor local de consultas Vidasalud (los equipos de la clínica se conectan desde la interfaz)."
+    )
+    parser.add_argument("--servidor", action="store_true", help=argparse.SUPPRESS)
+    _agregar_argumentos_origen(parser)
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 para aceptar conexiones de la red local")
+    parser.add_argument("--puerto", type=int, default=SERVIDOR_PUERTO)
+    parser.add_argument("--token", default=os.environ.get("VIDASALUD_TOKEN"),
+                        help="token de acceso compartido (o variable VIDASALUD_TOKEN); "
+                             "fuera de 127.0.0.1 se genera uno si no se indica")
+    parser.add_argument("--certificado", metavar="PEM", help="certificado TLS para servir por https")
+    parser.add_argument("--clave", metavar="PEM", help="clave privada del certificado TLS")
+    args = parser.parse_args(argv)
+    if bool(args.certificado) != bool(args.clave):
+        parser.error("--certificado y --clave van juntos")
+
+    # Los datos incluyen pacientes y RUT: en la red local nunca se sirven sin token
+    local = args.host in HOSTS_LOCALES
+    token = args.token
+    if not token and not local:
+        token = secrets.token_urlsafe(16)
+        print(f"Token de acceso (ingréselo al conectar; use --token para fijarlo): {token}")
+    if not local and not args.certificado:
+        print("Aviso: sin --certificado/--clave el tráfico viaja sin cifrar por la red local.", file=sys.stderr)
+
+    df, origen_nombre = _cargar_origen(args)
+    if df is None: return 1
+
+    print("Indexando...")
+    servidor = ServidorConsultas((args.host, args.puerto), EstadoConsultas(df, origen_nombre), token)
+    esquema = "http"
+    if args.certificado:
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        contexto.load_cert_chain(args.certificado, args.clave)
+        servidor.socket = contexto.wrap_socket(servidor.socket, server_side=True)
+        esquema = "https"
+    print(f"Sirviendo {len(df):,} filas de {origen_nombre} en {esquema}://{args.host}:{args.puerto}/ (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+# --- MODO SIN INTERFAZ (CLI) ---
+
+def _agregar_argumentos_origen(parser):
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--archivo", nargs="+", metavar="XLSX", help="uno o más archivos Excel")
+    origen.add_argument("--biblioteca", nargs="?", const="", metavar="CARPETA",
+                        help="todos los .xlsx de la carpeta (por defecto archivos_excel)")
+    parser.add_argument("--sin-cache", action="store_true", help="no usar ni actualizar la caché de archivos")
+    parser.add_argument("--perfil", action="store_true",
+                        help="leer solo las columnas del perfil guardado desde la interfaz")
+
+
+def _cargar_origen(args):
+    """Lee los archivos indicados por --archivo/--biblioteca; devuelve (df, nombre) o (None, None)"""
+    if args.archivo:
+        archivos = args.archivo
+    else:
+        carpeta = args.biblioteca or get_library_path()
+        archivos = listar_xlsx(carpeta)
+    if not archivos:
+        print("No se encontraron archivos .xlsx.", file=sys.stderr)
+        return None, None
+
+    cache_dir = None if args.sin_cache else get_cache_path()
+    columnas = (cargar_config().get("perfil_columnas") or None) if args.perfil else None
+    if getattr(args, "streaming", False):
+        partes = []
+        for path in archivos:
+            print(f"Recorriendo {os.path.basename(path)}...")
+            try:
+                df, _, leidas = extraer_prestaciones_streaming(path, args.prestacion, columnas=columnas)
+            except Exception as e:
+                print(f"{os.path.basename(path)}: {e}", file=sys.stderr)
+                return None, None
+            print(f"{len(df):,} de {leidas:,} filas")
+            if len(archivos) > 1:
+                df[COLUMNA_ORIGEN] = os.path.basename(path)
+            partes.append(df)
+        origen_nombre = os.path.basename(archivos[0]) if len(archivos) == 1 else "Biblioteca"
+        # Un archivo sin coincidencias llega con columnas object vacías: al concatenarlo
+        # convertiría montos y fechas de todo el resultado en object
+        partes = [p for p in partes if len(p)] or partes[:1]
+        return compactar_dataframe(pd.concat(partes, ignore_index=True)), origen_nombre
+
+    if len(archivos) == 1:
+        origen_nombre = os.path.basename(archivos[0])
+        print(f"Leyendo {origen_nombre}...")
+        df = leer_excel(archivos[0], cache_dir, columnas)
+    else:
+        origen_nombre = "Biblioteca"
+        print(f"Leyendo {len(archivos)} archivos...")
+        df = compactar_dataframe(cargar_biblioteca(archivos, cache_dir, lambda f, t=None: print(t), columnas=columnas))
+
+    if "Prestación" not in df.columns:
+        print("Columna 'Prestación' no encontrada.", file=sys.stderr)
+        return None, None
+    return df, origen_nombre
+
+
+def ejecutar_cli(argv=None):
+    """Filtra y exporta sin abrir la ventana, p. ej. desde una tarea programada"""
+    parser = argparse.ArgumentParser(
+        prog="vidasalud --batch",
+        description="Filtrado de prestaciones Vidasalud sin interfaz gráfica."
+    )
+    parser.add_argument("--batch", action="store_true", help=argparse.SUPPRESS)
+    _agregar_argumentos_origen(parser)
+    parser.add_argument("--prestacion", action="append", default=[], metavar="NOMBRE",
+                        help="prestación a filtrar (repetible); sin este parámetro se exportan todas")
+    parser.add_argument("--dividir", action="store_true",
+                        help="un archivo por prestación en lugar de uno solo")
+    parser.add_argument("--salida", metavar="CARPETA", help="carpeta de destino (por defecto Documents/Vidasalud_Export)")
+    parser.add_argument("--formato", choices=FORMATOS_EXPORTACION, default=FORMATOS_EXPORTACION[0])
+    parser.add_argument("--streaming", action="store_true",
+                        help="recorrer cada archivo fila a fila guardando solo las prestaciones pedidas "
+                             "(para libros que no caben en memoria; requiere --prestacion)")
+    args = parser.parse_args(argv)
+    if args.streaming and not args.prestacion:
+        parser.error("--streaming requiere al menos un --prestacion")
+
+    df, origen_nombre = _cargar_origen(args)
+    if df is None: return 1
+
+    # Una sola pasada de groupby; cada prestación es luego una toma posicional
+    prestaciones, indice = indexar_prestaciones(df)
+    seleccion = args.prestacion or prestaciones
+    for p in seleccion:
+        if p not in indice:
+            print(f"Aviso: prestación sin registros: {p}", file=sys.stderr)
+    seleccion = [p for p in seleccion if p in indice]
+    if args.prestacion and not seleccion:
+        # Un archivo vacío con código 0 engañaría a una tarea programada
+        print("Error: ninguna de las prestaciones pedidas tiene registros; no se exportó nada.", file=sys.stderr)
+        return 1
+
+    out_dir = args.salida or get_export_path()
+    if not os.path.exists(out_dir): os.makedirs(out_dir)
+
+    if args.dividir:
+        trabajos = [(p, indice[p]) for p in seleccion]
+    else:
+        if not args.prestacion:
+            suffix = "COMPLETO"
+        elif len(args.prestacion) == 1:
+            suffix = args.prestacion[0]
+        else:
+            suffix = "VARIAS"
+        posiciones = np.sort(np.concatenate([indice[p] for p in seleccion])) if seleccion else np.array([], dtype=int)
+        trabajos = [(suffix, posiciones)]
+
+    # Prestaciones distintas pueden dar el mismo nombre limpio ("A/B", "A_B", "A B"):
+    # ruta_unica evita que una exportación pise a otra dentro del mismo segundo
+    errores = 0
+    for suffix, posiciones in trabajos:
+        path = ruta_unica(os.path.join(out_dir, nombre_exportacion(origen_nombre, suffix, args.formato)))
+        try:
+            filas_por_segundo = exportar_dataframe(df.take(posiciones), path, args.formato)
+        except Exception as e:
+            print(f"Error al exportar {suffix}: {e}", file=sys.stderr)
+            errores += 1
+            continue
+        print(f"{len(posiciones):,} filas -> {path} ({filas_por_segundo:,.0f} filas/s)")
+    return 1 if errores else 0
+
+
+def registrar_arranque(tiempos):
+    """Agrega el informe de arranque al log de rendimiento (y a la consola con --informe-arranque)"""
+    registro = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "operacion": "arranque",
+        "congelado": bool(getattr(sys, "frozen", False)),
+        **tiempos,
+        "importaciones_s": dict(TIEMPOS_IMPORTACION),
+    }
+    try:
+        _get_perf_logger().info(json.dumps(registro, ensure_ascii=False))
+    except Exception:
+        pass
+    if "--informe-arranque" in sys.argv[1:]:
+        print(json.dumps(registro, ensure_ascii=False, indent=2), flush=True)
+
+
 def main():
+    if "--batch" in sys.argv[1:]:
+        sys.exit(ejecutar_cli(sys.argv[1:]))
+    if "--servidor" in sys.argv[1:]:
+        sys.exit(ejecutar_servidor(sys.argv[1:]))
+
+    # --- THEME CONFIGURATION ---
+    # "System" uses the OS mode (Dark/Light)
+    # "DarkBlue", "Blue", "Green" are built-in themes. We can use a custom color if needed for "Million Dollar" look.
+    ctk.set_appearance_mode("System")  
+    ctk.set_default_color_theme("blue")  # We will override specific colors for a premium look
+
     app = ctk.CTk()
     gui = FiltradorMultiArchivosGUI(app)
     app.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Necesario para el modo biblioteca en el ejecutable
     main()
@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sistema_vidasalud sin error.py")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Módulo de la aplicación (el script tiene espacios en el nombre)"""
+    if "vidasalud_app" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("vidasalud_app", APP_PATH)
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules["vidasalud_app"] = modulo  # Necesario para el pool de procesos
+        spec.loader.exec_module(modulo)
+    return sys.modules["vidasalud_app"]
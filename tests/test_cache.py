@@ -0,0 +1,113 @@
+import os
+
+import pandas as pd
+import pytest
+
+
+def escribir_libro(path, montos):
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["Reporte"]]).to_excel(writer, index=False, header=False)
+        pd.DataFrame({"Prestación": ["Limpieza", "Corona"][:len(montos)], "Monto": montos,
+                      "Profesional": ["Dr. A", "Dr. B"][:len(montos)]}).to_excel(writer, index=False, startrow=1)
+
+
+def entradas(cache_dir):
+    return sorted(n for n in os.listdir(cache_dir) if n.endswith(".pkl"))
+
+
+@pytest.fixture
+def libro(tmp_path):
+    path = tmp_path / "datos" / "prestaciones.xlsx"
+    path.parent.mkdir()
+    escribir_libro(path, [1000, 2000])
+    return str(path)
+
+
+@pytest.fixture
+def parseos(app, monkeypatch):
+    """Cuenta las lecturas reales del Excel (las que no salen de la caché)"""
+    llamadas = []
+    original = app._parsear_excel
+
+    def contar(path, columnas=None):
+        llamadas.append((path, columnas))
+        return original(path, columnas)
+
+    monkeypatch.setattr(app, "_parsear_excel", contar)
+    return llamadas
+
+
+def test_segunda_lectura_sale_de_la_cache(app, libro, tmp_path, parseos):
+    cache_dir = str(tmp_path / "cache")
+    primera = app.leer_excel(libro, cache_dir)
+    segunda = app.leer_excel(libro, cache_dir)
+    assert len(parseos) == 1
+    pd.testing.assert_frame_equal(primera, segunda)
+    assert len(entradas(cache_dir)) == 1
+    assert not [n for n in os.listdir(cache_dir) if n.endswith(".tmp")]
+
+
+def test_perfiles_distintos_conviven(app, libro, tmp_path, parseos):
+    cache_dir = str(tmp_path / "cache")
+    app.leer_excel(libro, cache_dir)
+    proyectado = app.leer_excel(libro, cache_dir, ["Monto"])
+    assert list(proyectado.columns) == ["Prestación", "Monto"]
+    assert len(entradas(cache_dir)) == 2
+
+    # Ninguna de las dos lecturas desalojó a la otra
+    app.leer_excel(libro, cache_dir)
+    app.leer_excel(libro, cache_dir, ["Monto"])
+    assert len(parseos) == 2
+
+
+def test_archivo_modificado_reemplaza_sus_entradas(app, libro, tmp_path, parseos):
+    cache_dir = str(tmp_path / "cache")
+    app.leer_excel(libro, cache_dir)
+    app.leer_excel(libro, cache_dir, ["Monto"])
+    viejas = set(entradas(cache_dir))
+
+    escribir_libro(libro, [1500, 2500])
+    st = os.stat(libro)
+    os.utime(libro, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    df = app.leer_excel(libro, cache_dir)
+    assert df["Monto"].tolist() == [1500, 2500]
+
+    actuales = set(entradas(cache_dir))
+    assert not (actuales & viejas)  # Las entradas con la firma vieja ya no sirven
+    assert len(actuales) == 1
+
+    app.leer_excel(libro, cache_dir, ["Monto"])
+    assert len(entradas(cache_dir)) == 2  # La del otro perfil convive con la nueva
+    assert len(parseos) == 4
+
+
+def test_otro_archivo_no_se_toca(app, libro, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    otro = str(tmp_path / "datos" / "otro.xlsx")
+    escribir_libro(otro, [1])
+    app.leer_excel(libro, cache_dir)
+    app.leer_excel(otro, cache_dir)
+    assert len(entradas(cache_dir)) == 2
+
+
+def test_entrada_corrupta_se_vuelve_a_parsear(app, libro, tmp_path, parseos):
+    cache_dir = str(tmp_path / "cache")
+    app.leer_excel(libro, cache_dir)
+    (nombre,) = entradas(cache_dir)
+    with open(os.path.join(cache_dir, nombre), "wb") as f:
+        f.write(b"no es un pickle")
+    assert app.leer_excel(libro, cache_dir)["Monto"].tolist() == [1000, 2000]
+    assert len(parseos) == 2
+
+
+def test_podar_cache_elimina_primero_las_menos_usadas(app, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    for i, nombre in enumerate(["a.pkl", "b.pkl", "c.pkl", "d.pkl"]):
+        path = cache_dir / nombre
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))  # a es la usada hace más tiempo
+    os.utime(cache_dir / "a.pkl", (2_000_000, 2_000_000))  # ... pero se acaba de volver a usar
+
+    app.podar_cache(str(cache_dir), max_bytes=250)
+    assert sorted(os.listdir(cache_dir)) == ["a.pkl", "d.pkl"]
@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+
+def leer_hojas(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return {ws.title: [list(fila) for fila in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+@pytest.fixture
+def limite(app, monkeypatch):
+    monkeypatch.setattr(app, "EXCEL_MAX_FILAS", 4)  # Encabezado + 3 filas por hoja
+    monkeypatch.setattr(app, "EXPORT_CHUNK_ROWS", 2)  # Los bloques no coinciden con las hojas
+
+
+def test_xlsx_se_reparte_en_hojas(app, limite, tmp_path):
+    df = pd.DataFrame({"Prestación": [f"P{i}" for i in range(7)], "Monto": np.arange(7)})
+    path = tmp_path / "salida.xlsx"
+    app.exportar_dataframe(df, str(path), "xlsx")
+
+    hojas = leer_hojas(path)
+    assert list(hojas) == ["Hoja1", "Hoja2", "Hoja3"]
+    for filas in hojas.values():
+        assert filas[0] == ["Prestación", "Monto"]
+        assert len(filas) <= 4
+    datos = [fila for filas in hojas.values() for fila in filas[1:]]
+    assert datos == [[f"P{i}", i] for i in range(7)]
+
+
+def test_xlsx_justo_en_el_limite_usa_una_hoja(app, limite, tmp_path):
+    path = tmp_path / "salida.xlsx"
+    app.exportar_dataframe(pd.DataFrame({"a": [1, 2, 3]}), str(path), "xlsx")
+    assert list(leer_hojas(path)) == ["Hoja1"]
+
+
+def test_xlsx_vacio_tiene_solo_encabezado(app, tmp_path):
+    path = tmp_path / "vacio.xlsx"
+    app.exportar_dataframe(pd.DataFrame({"Prestación": [], "Monto": []}), str(path), "xlsx")
+    assert leer_hojas(path) == {"Hoja1": [["Prestación", "Monto"]]}
+
+
+def test_csv_por_bloques(app, limite, tmp_path):
+    df = pd.DataFrame({"Prestación": ["Limpieza ", "Corona", None], "Monto": [1.5, None, 3.0]})
+    path = tmp_path / "salida.csv"
+    app.exportar_dataframe(df, str(path), "csv")
+    leido = pd.read_csv(path, encoding="utf-8-sig", keep_default_na=True)
+    assert leido["Prestación"].tolist()[:2] == ["Limpieza ", "Corona"]
+    assert len(leido) == 3
+
+
+def test_exportacion_cancelada_no_deja_archivo(app, limite, tmp_path):
+    cancelado = threading.Event()
+    cancelado.set()
+    path = tmp_path / "salida.xlsx"
+    assert app.exportar_dataframe(pd.DataFrame({"a": range(10)}), str(path), "xlsx", cancelado=cancelado) is None
+    assert not path.exists()
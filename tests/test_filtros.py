@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Prestación": ["Limpieza ", "Limpieza", "Limpieza ", " Corona", "Resina"],
+        "Monto": [1000, 2000, 3000, 4000, 5000],
+        "Fecha Atención": pd.to_datetime(["2024-01-05", "2024-02-10", "2024-03-15", "2024-04-20", "2024-05-25"]),
+    })
+
+
+@pytest.fixture(params=[True, False], ids=["con_indice", "sin_indice"])
+def motor(request, app, df):
+    indice = app.indexar_prestaciones(df)[1] if request.param else None
+    return app.MotorFiltros(df, indice)
+
+
+def test_igualdad_respeta_espacios(motor, df):
+    resultado = motor.resultado([("Prestación", "=", "Limpieza ")])
+    esperado = df[df["Prestación"].astype(str) == "Limpieza "]
+    assert len(resultado) == 2
+    assert resultado.index.tolist() == esperado.index.tolist()
+    assert motor.posiciones([("Prestación", "=", "Limpieza")]).tolist() == [1]
+    assert motor.posiciones([("Prestación", "=", " Corona")]).tolist() == [3]
+
+
+def test_en_lista_respeta_espacios(motor):
+    posiciones = motor.posiciones([("Prestación", "en lista", ["Limpieza ", "Resina"])])
+    assert posiciones.tolist() == [0, 2, 4]
+
+
+def test_clave_de_cache_distingue_espacios(app):
+    con = app.normalizar_criterios([("Prestación", "=", "Limpieza ")])
+    sin = app.normalizar_criterios([("Prestación", "=", "Limpieza")])
+    assert con != sin
+
+
+def test_texto_del_usuario_se_limpia(app):
+    assert app.parsear_valor_criterio("=", "  Limpieza ") == "Limpieza"
+    assert app.parsear_valor_criterio("en lista", " A , B ,, ") == ["A", "B"]
+    assert app.parsear_valor_criterio("entre", " 1 ; 5 ") == ("1", "5")
+
+
+def test_criterios_combinados(motor):
+    criterios = [("Prestación", "=", "Limpieza "), ("Monto", "entre", ("2000", ""))]
+    assert motor.posiciones(criterios).tolist() == [2]
+    # Mismo resultado desde la caché, sin importar el orden de los criterios
+    assert motor.posiciones(criterios[::-1]).tolist() == [2]
+
+
+def test_entre_fechas_y_contiene(motor):
+    assert motor.posiciones([("Fecha Atención", "entre", ("01/02/2024", "31/03/2024"))]).tolist() == [1, 2]
+    assert motor.posiciones([("Prestación", "contiene", "corona")]).tolist() == [3]
+
+
+def test_operador_desconocido(app):
+    with pytest.raises(ValueError):
+        app.normalizar_criterios([("Monto", ">", "1")])
+
+
+def test_indice_busqueda_igual_a_fuerza_bruta(app):
+    nombres = ["Limpieza simple", "Limpieza profunda", "Corona porcelana", "Resina compuesta", "Rx periapical"]
+    indice = app.IndiceBusqueda(nombres)
+    for consulta in ["", "l", "li", "lim", "limp", "limpieza p", "ona", "RX", "zzz", "a"]:
+        esperado = [i for i, n in enumerate(nombres) if consulta.lower() in n.lower()]
+        assert indice.buscar(consulta) == esperado, consulta
+
+
+def test_compactar_dataframe(app):
+    df = pd.DataFrame({
+        "Prestación": ["A", "B"] * 50,
+        "Monto": np.arange(100, dtype="int64"),
+        "Copago": np.arange(100, dtype="float64"),
+        "Fecha Atención": ["05/01/2024"] * 100,
+        "Glosa": [f"texto {i}" for i in range(100)],
+    })
+    compacto = app.compactar_dataframe(df.copy())
+    assert isinstance(compacto["Prestación"].dtype, pd.CategoricalDtype)
+    assert compacto["Monto"].dtype == np.int8
+    assert pd.api.types.is_integer_dtype(compacto["Copago"])
+    assert pd.api.types.is_datetime64_any_dtype(compacto["Fecha Atención"])
+    assert compacto["Fecha Atención"].iloc[0] == pd.Timestamp("2024-01-05")
+    assert not isinstance(compacto["Glosa"].dtype, pd.CategoricalDtype)
+    assert compacto["Monto"].tolist() == df["Monto"].tolist()
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    carpeta = tmp_path / "archivos_excel"
+    carpeta.mkdir()
+    return carpeta
+
+
+def escribir(path, contenido=b"xlsx", mtime_ns=None):
+    path.write_bytes(contenido)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_primer_escaneo_reporta_agregados(app, carpeta):
+    a = escribir(carpeta / "a.xlsx")
+    escribir(carpeta / "~$a.xlsx")  # Bloqueo de Excel: se ignora
+    escribir(carpeta / "notas.txt")
+
+    nuevo, cambios = app.escanear_biblioteca(str(carpeta), {})
+    assert list(nuevo) == [a]
+    assert cambios == {"agregados": [a], "modificados": [], "tocados": [], "eliminados": []}
+
+
+def test_tocado_modificado_y_eliminado(app, carpeta):
+    a = escribir(carpeta / "a.xlsx", b"uno", 10**18)
+    b = escribir(carpeta / "b.xlsx", b"dos", 10**18)
+    c = escribir(carpeta / "c.xlsx", b"tres", 10**18)
+    manifiesto, _ = app.escanear_biblioteca(str(carpeta), {})
+
+    escribir(carpeta / "a.xlsx", b"uno", 10**18 + 10**9)  # Mismo contenido, otro mtime
+    escribir(carpeta / "b.xlsx", b"DOS", 10**18 + 10**9)  # Mismo tamaño, otro contenido
+    os.remove(c)
+
+    nuevo, cambios = app.escanear_biblioteca(str(carpeta), manifiesto)
+    assert cambios == {"agregados": [], "modificados": [b], "tocados": [a], "eliminados": [c]}
+    assert sorted(nuevo) == [a, b]
+
+
+def test_sin_cambios_no_recalcula_hash(app, carpeta, monkeypatch):
+    escribir(carpeta / "a.xlsx", b"uno", 10**18)
+    manifiesto, _ = app.escanear_biblioteca(str(carpeta), {})
+
+    def no_llamar(path):
+        raise AssertionError("hash de un archivo sin cambios")
+
+    monkeypatch.setattr(app, "hash_archivo", no_llamar)
+    nuevo, cambios = app.escanear_biblioteca(str(carpeta), manifiesto)
+    assert nuevo == manifiesto
+    assert not any(cambios.values())
+
+
+def test_pendientes_mas_recientes_primero(app, carpeta):
+    viejo = escribir(carpeta / "viejo.xlsx", b"1", 10**18)
+    reciente = escribir(carpeta / "reciente.xlsx", b"2", 10**18 + 10**9)
+    nuevo, cambios = app.escanear_biblioteca(str(carpeta), {})
+    assert app.pendientes_de_precarga(nuevo, cambios) == [reciente, viejo]
+
+
+def test_manifiesto_sin_pendientes(app, carpeta):
+    a = escribir(carpeta / "a.xlsx", b"uno", 10**18)
+    b = escribir(carpeta / "b.xlsx", b"dos", 10**18)
+    previo, _ = app.escanear_biblioteca(str(carpeta), {})
+
+    escribir(carpeta / "b.xlsx", b"DOS", 10**18 + 10**9)
+    c = escribir(carpeta / "c.xlsx", b"tres", 10**18)
+    nuevo, cambios = app.escanear_biblioteca(str(carpeta), previo)
+    pendientes = app.pendientes_de_precarga(nuevo, cambios)
+    assert sorted(pendientes) == [b, c]
+
+    guardado = app.manifiesto_sin_pendientes(previo, nuevo, pendientes)
+    assert guardado == {a: nuevo[a], b: previo[b]}  # c aún no existe para el manifiesto
+
+    # Si la precarga no llegó a correr, el próximo escaneo los vuelve a encontrar
+    _, cambios = app.escanear_biblioteca(str(carpeta), guardado)
+    assert cambios["modificados"] == [b] and cambios["agregados"] == [c]
+
+
+def test_precarga_registra_solo_lo_procesado(app, carpeta, tmp_path, monkeypatch):
+    a = escribir(carpeta / "a.xlsx")
+    b = escribir(carpeta / "b.xlsx", b"otro")
+    cache_dir = str(tmp_path / "cache")
+    nuevo, _ = app.escanear_biblioteca(str(carpeta), {})
+    app.guardar_manifiesto(cache_dir, {})
+
+    leidos = []
+    monkeypatch.setattr(app, "leer_excel", lambda path, cache_dir, columnas=None: leidos.append(path))
+
+    # Precarga interrumpida tras el primer archivo (p. ej. se cerró la app)
+    app.precargar_archivos([a], cache_dir, None, {p: nuevo[p] for p in (a, b)})
+    assert leidos == [a]
+    assert app.cargar_manifiesto(cache_dir) == {a: nuevo[a]}
+
+    app.precargar_archivos([b], cache_dir, None, {p: nuevo[p] for p in (a, b)})
+    assert app.cargar_manifiesto(cache_dir) == nuevo
+
+
+def test_precarga_registra_aunque_falle_la_lectura(app, carpeta, tmp_path, monkeypatch):
+    a = escribir(carpeta / "a.xlsx")
+    cache_dir = str(tmp_path / "cache")
+    nuevo, _ = app.escanear_biblioteca(str(carpeta), {})
+
+    def falla(*args, **kwargs):
+        raise ValueError("archivo dañado")
+
+    monkeypatch.setattr(app, "leer_excel", falla)
+    app.precargar_archivos([a], cache_dir, None, nuevo)
+    assert app.cargar_manifiesto(cache_dir) == nuevo  # No se reintenta en cada escaneo
+
+
+def test_manifiesto_ida_y_vuelta(app, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    assert app.cargar_manifiesto(cache_dir) == {}
+    datos = {"/ruta/á.xlsx": {"size": 1, "mtime": 2, "hash": "abc"}}
+    app.guardar_manifiesto(cache_dir, datos)
+    assert app.cargar_manifiesto(cache_dir) == datos
+    assert os.listdir(cache_dir) == [app.MANIFIESTO_FILENAME]  # Sin temporales
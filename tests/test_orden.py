@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+
+def test_orden_ascendente_estable_vacios_al_final(app):
+    serie = pd.Series([2, 1, np.nan, 2, 1, 3, np.nan, 2])
+    assert app.orden_columna(serie).tolist() == [1, 4, 0, 3, 7, 5, 2, 6]
+
+
+def test_orden_descendente_estable_vacios_al_final(app):
+    serie = pd.Series([2, 1, np.nan, 2, 1, 3, np.nan, 2])
+    assert app.orden_columna(serie, descendente=True).tolist() == [5, 0, 3, 7, 1, 4, 2, 6]
+
+
+def test_orden_texto_numerico(app):
+    # Texto que en realidad es numérico (p. ej. resultados recibidos como texto)
+    serie = pd.Series(["10", "9", "", "100"], dtype=object)
+    assert app.orden_columna(serie).tolist() == [1, 0, 3, 2]
+
+
+def test_orden_tipos_mezclados(app):
+    serie = pd.Series(["b", 1, None, "a", 1], dtype=object)
+    assert app.orden_columna(serie).tolist() == [1, 4, 3, 0, 2]
+    assert app.orden_columna(serie, descendente=True).tolist() == [0, 3, 1, 4, 2]
+
+
+def test_orden_fechas_y_categorias(app):
+    fechas = pd.Series(pd.to_datetime(["2024-01-02", "2024-01-01", None, "2024-01-02"]))
+    assert app.orden_columna(fechas, descendente=True).tolist() == [0, 3, 1, 2]
+    categorias = pd.Series(pd.Categorical(["b", "a", None, "b", "a"]))
+    assert app.orden_columna(categorias, descendente=True).tolist() == [0, 3, 1, 4, 2]
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def df(app):
+    n = 1200
+    datos = pd.DataFrame({
+        "Prestación": np.where(np.arange(n) % 3 == 0, "Limpieza ", "Corona"),
+        "Monto": np.where(np.arange(n) % 7 == 0, np.nan, np.arange(n) * 10.0),
+        "Fecha Atención": pd.to_datetime("2024-01-01") + pd.to_timedelta(np.arange(n) % 40, unit="D"),
+        "Paciente": [None if i % 5 == 0 else f"P{i}" for i in range(n)],
+    })
+    return app.compactar_dataframe(datos)
+
+
+@pytest.fixture
+def servidor(app, df):
+    srv = app.ServidorConsultas(("127.0.0.1", 0), app.EstadoConsultas(df, "prueba.xlsx"), token="secreto")
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_tabla_json_conserva_tipos(app, df):
+    local = df.iloc[:10].reset_index(drop=True)
+    remoto = app.tabla_desde_json(app.tabla_json(df, slice(0, 10)))
+    assert pd.api.types.is_numeric_dtype(remoto["Monto"])
+    assert pd.api.types.is_datetime64_any_dtype(remoto["Fecha Atención"])
+    # La grilla muestra lo mismo en local y en modo cliente
+    assert app.formatear_filas(remoto, slice(None)) == app.formatear_filas(local, slice(None))
+
+
+def test_servidor_exige_token(app, servidor):
+    with pytest.raises(Exception, match="401"):
+        app.ClienteConsultas(servidor).estado()
+    assert app.ClienteConsultas(servidor, "secreto").estado()["filas"] == 1200
+
+
+def test_error_del_servidor_llega_al_cliente(app, servidor):
+    cliente = app.ClienteConsultas(servidor, "secreto")
+    with pytest.raises(Exception, match="Consulta inválida"):
+        cliente.consulta(criterios=[("No existe", "=", "x")])
+
+
+def test_resultado_remoto_por_paginas(app, servidor, df):
+    cliente = app.ClienteConsultas(servidor, "secreto")
+    esperado = df[df["Prestación"].astype(str) == "Corona"].reset_index(drop=True)
+
+    remoto = app.ResultadoRemoto.abrir(cliente, "Corona")
+    assert len(remoto) == len(esperado) == 800
+    assert remoto.filas(0, 5) == app.formatear_filas(esperado, slice(0, 5))
+    assert remoto.filas(495, 505) is None  # Segunda página aún no descargada
+    remoto.cargar(495, 505)
+    filas = remoto.filas(495, 505)
+    assert len(filas) == 10
+    assert filas == app.formatear_filas(esperado, slice(495, 505))
+
+    completo = remoto.descargar()
+    pd.testing.assert_frame_equal(completo, esperado, check_dtype=False, check_categorical=False)
+
+
+def test_resultado_remoto_ordenado_en_servidor(app, servidor, df):
+    cliente = app.ClienteConsultas(servidor, "secreto")
+    remoto = app.ResultadoRemoto.abrir(cliente, "Limpieza ").ordenado(1, True)
+    montos = remoto.descargar()["Monto"]
+    assert montos.isna().sum() > 0
+    assert montos.iloc[:montos.notna().sum()].is_monotonic_decreasing
+    assert montos.iloc[montos.notna().sum():].isna().all()  # Vacíos al final
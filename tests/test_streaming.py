@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def libro(tmp_path):
+    """xlsx con el layout Vidasalud: fila de título y encabezados en la fila 2"""
+    n = 2500
+    df = pd.DataFrame({
+        "Prestación": np.array(["Limpieza ", "Limpieza", "Corona", 101], dtype=object)[np.arange(n) % 4],
+        "Monto": np.arange(n) * 100,
+        "Fecha Atención": pd.to_datetime("2024-01-01") + pd.to_timedelta(np.arange(n) % 60, unit="D"),
+        "Observación": [None if i % 3 else f"obs {i}" for i in range(n)],
+    })
+    path = tmp_path / "prestaciones.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["Reporte de prestaciones"]]).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=1)
+    return str(path)
+
+
+@pytest.fixture
+def completo(app, libro):
+    return app.leer_excel(libro)
+
+
+@pytest.mark.parametrize("prestacion", ["Limpieza ", "Limpieza", "101"])
+def test_streaming_igual_a_carga_completa(app, libro, completo, prestacion, monkeypatch):
+    monkeypatch.setattr(app, "STREAMING_CHUNK_ROWS", 100)  # Varios bloques
+    df, distintas, leidas = app.extraer_prestaciones_streaming(libro, [prestacion])
+
+    prestaciones, indice = app.indexar_prestaciones(completo)
+    esperado = app.MotorFiltros(completo, indice).resultado([("Prestación", "=", prestacion)]).reset_index(drop=True)
+    assert leidas == len(completo)
+    assert distintas == prestaciones
+    pd.testing.assert_frame_equal(df, esperado, check_dtype=False, check_categorical=False)
+
+
+def test_streaming_aplica_criterios(app, libro, completo, monkeypatch):
+    monkeypatch.setattr(app, "STREAMING_CHUNK_ROWS", 100)
+    criterios = [("Monto", "entre", ("50000", "150000")), ("Fecha Atención", "entre", ("10/01/2024", ""))]
+    df, _, _ = app.extraer_prestaciones_streaming(libro, ["Limpieza "], criterios=criterios)
+
+    prestaciones, indice = app.indexar_prestaciones(completo)
+    esperado = app.MotorFiltros(completo, indice).resultado(criterios + [("Prestación", "=", "Limpieza ")])
+    assert len(df) > 0
+    assert df["Monto"].tolist() == esperado["Monto"].tolist()
+
+
+def test_streaming_columna_de_filtro_inexistente(app, libro):
+    with pytest.raises(Exception, match="No existe"):
+        app.extraer_prestaciones_streaming(libro, ["Corona"], criterios=[("No existe", "=", "x")])
+
+
+def test_cli_streaming_varios_archivos_conserva_tipos(app, libro, tmp_path):
+    otro = tmp_path / "otro.xlsx"
+    with pd.ExcelWriter(otro) as writer:
+        pd.DataFrame([["Reporte"]]).to_excel(writer, index=False, header=False)
+        pd.DataFrame({"Prestación": ["Resina"], "Monto": [1], "Fecha Atención": [pd.Timestamp("2024-02-01")],
+                      "Observación": [None]}).to_excel(writer, index=False, startrow=1)
+
+    salida = tmp_path / "salida"
+    codigo = app.ejecutar_cli(["--batch", "--archivo", libro, str(otro), "--streaming", "--prestacion", "Corona",
+                               "--formato", "csv", "--salida", str(salida)])
+    assert codigo == 0
+    (exportado,) = salida.iterdir()
+    df = pd.read_csv(exportado, encoding="utf-8-sig")
+    assert len(df) == 625
+    assert df["Fecha Atención"].str.fullmatch(r"\d{4}-\d{2}-\d{2}").all()  # Fechas, no texto con hora
+    assert set(df[app.COLUMNA_ORIGEN]) == {"prestaciones.xlsx"}
+
+
+def test_cli_streaming_sin_columna_prestacion(app, tmp_path, capsys):
+    path = tmp_path / "sin.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["Reporte"]]).to_excel(writer, index=False, header=False)
+        pd.DataFrame({"Otra": [1]}).to_excel(writer, index=False, startrow=1)
+    codigo = app.ejecutar_cli(["--batch", "--archivo", str(path), "--streaming", "--prestacion", "A",
+                               "--salida", str(tmp_path / "salida")])
+    assert codigo == 1
+    assert "Prestación" in capsys.readouterr().err